@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 {
     'name': 'My HR - Complete HR Solution',
-    'version': '19.0.1.0.0',
+    'version': '19.0.1.0.1',
     'category': 'Human Resources',
     'summary': 'Geofenced Attendance, Custom Payroll with WPS, Leave Accrual & Employee Dashboard',
     'description': """
@@ -12,7 +12,7 @@
         - Employee Dashboard with Task/Request Management
     """,
     'author': 'Ali Musa Alhashim',
-    'depends': ['hr', 'hr_attendance', 'hr_holidays', 'mail', 'web','base'],
+    'depends': ['hr', 'hr_attendance', 'hr_holidays', 'mail', 'bus', 'web','base'],
     'data': [
         # Security
         'security/my_hr_groups.xml',
@@ -23,12 +23,18 @@
         'data/cron_data.xml',
         # Views
         'views/hr_office_geofence_views.xml',
+        'views/geofence_audit_views.xml',
         'views/hr_employee_views.xml',
         'views/hr_attendance_views.xml',
         'views/payroll_batch_views.xml',
         'views/payslip_views.xml',
+        'views/payroll_report_views.xml',
+        'views/leave_accrual_views.xml',
+        'views/attendance_daily_views.xml',
         'views/hr_task_views.xml',
         'views/dashboard_views.xml',
+        'views/perf_stat_views.xml',
+        'views/res_config_settings_views.xml',
         'views/menu_views.xml',
     ],
     'assets': {
@@ -36,8 +42,11 @@
             'my_hr/static/src/css/my_hr.css',
             'my_hr/static/src/xml/systray_checkin.xml',
             'my_hr/static/src/xml/dashboard.xml',
+            'my_hr/static/src/xml/generation_progress.xml',
+            'my_hr/static/src/js/checkin_queue.js',
             'my_hr/static/src/js/systray_checkin.js',
             'my_hr/static/src/js/dashboard.js',
+            'my_hr/static/src/js/generation_progress.js',
         ],
     },
     'post_init_hook': 'post_init_hook',
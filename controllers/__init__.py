@@ -1,3 +1,4 @@
 # -*- coding: utf-8 -*-
 from . import attendance_controller
-from . import dashboard_controller
\ No newline at end of file
+from . import dashboard_controller
+from . import payroll_controller
\ No newline at end of file
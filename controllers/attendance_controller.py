@@ -1,14 +1,26 @@
 # -*- coding: utf-8 -*-
-import base64
 import logging
+import tempfile
+import uuid
 from datetime import datetime
 
+from psycopg2 import IntegrityError, OperationalError
+
 from odoo import http, fields
 from odoo.http import request
-from odoo.exceptions import AccessError
+from odoo.exceptions import AccessError, ConcurrencyError, UserError
+from odoo.addons.my_hr.models.perf_stat import profiled
 
 _logger = logging.getLogger(__name__)
 
+# Punches accepted per bulk request; the device sends the rest next time
+MAX_BULK_PUNCHES = 100
+# Largest check-in photo accepted by the upload route (a 320px webp is ~10 KB)
+MAX_PHOTO_SIZE = 2 * 1024 * 1024
+# Uploads are kept in memory up to this size, spilled to disk beyond it
+PHOTO_SPOOL_SIZE = 256 * 1024
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
 
 class AttendanceController(http.Controller):
 
@@ -19,112 +31,164 @@ class AttendanceController(http.Controller):
         methods=['POST'],
         csrf=True,
     )
+    @profiled('/my_hr/attendance/check')
     def check_in_out(self, **kwargs):
         """
         Endpoint called by the Systray button.
         Expected JSON payload:
           - latitude (float)
           - longitude (float)
-          - photo (str, base64 webp image)
+          - photo (str, base64 webp image, optional; devices upload it
+            to /my_hr/attendance/photo instead)
           - user_agent (str)
+          - client_uid (str, optional): idempotency key of the tap
         """
         try:
-            latitude = float(kwargs.get('latitude', 0))
-            longitude = float(kwargs.get('longitude', 0))
-            photo_b64 = kwargs.get('photo', '')
-            user_agent = kwargs.get('user_agent', '')[:255]
-            ip_address = request.httprequest.remote_addr or ''
-
-            employee = request.env['hr.employee'].search(
-                [('user_id', '=', request.env.uid)], limit=1
-            )
-            if not employee:
+            employee_ref = request.env['hr.employee']._my_hr_current_employee_ref()
+            if not employee_ref:
                 return {'success': False, 'error': 'No employee linked to your user account.'}
 
-            # Geofence validation
-            matched_office = None
-            allowed_offices = employee.allowed_office_ids
-            if allowed_offices:
-                for office in allowed_offices:
-                    if office.check_point_in_radius(latitude, longitude):
-                        matched_office = office
-                        break
-                if not matched_office:
-                    return {
-                        'success': False,
-                        'error': 'You are outside the allowed office area. Check-in denied.',
-                    }
-
-            # Determine check-in or check-out
-            last_attendance = request.env['hr.attendance'].search(
-                [('employee_id', '=', employee.id), ('check_out', '=', False)],
-                order='check_in desc',
-                limit=1
-            )
-
             now = fields.Datetime.now()
-            attendance_vals = {
-                'employee_id': employee.id,
-                'check_in_latitude': latitude,
-                'check_in_longitude': longitude,
-                'ip_address': ip_address,
-                'device_info': user_agent,
-                'geofence_id': matched_office.id if matched_office else False,
-            }
+            # A device-provided client_uid makes a retried request idempotent
+            client_uid = str(kwargs.get('client_uid') or uuid.uuid4())
+            results = request.env['hr.attendance']._my_hr_ingest_punches(employee_ref, [{
+                'client_uid': client_uid,
+                'timestamp': now.isoformat(),
+                'latitude': kwargs.get('latitude', 0),
+                'longitude': kwargs.get('longitude', 0),
+                'photo': kwargs.get('photo', ''),
+                'user_agent': kwargs.get('user_agent', ''),
+            }], request.httprequest.remote_addr or '')
+            result = results[0] if results else {'status': 'rejected', 'error': 'Invalid punch data.'}
 
-            if last_attendance:
-                # Check out
-                last_attendance.write({'check_out': now})
-                action = 'check_out'
+            if result['status'] == 'rejected':
+                return {'success': False, 'error': result['error']}
+            if result['status'] == 'duplicate':
+                status = request.env['hr.employee'].browse(employee_ref.id)._my_hr_attendance_status()
+                action = 'check_in' if status['checked_in'] else 'check_out'
             else:
-                # Check in
-                attendance_vals['check_in'] = now
-                if photo_b64:
-                    # Validate it's a proper base64 string
-                    try:
-                        base64.b64decode(photo_b64)
-                        attendance_vals['check_in_photo'] = photo_b64
-                    except Exception:
-                        _logger.warning('Invalid photo data received from user %s', request.env.uid)
-                request.env['hr.attendance'].create(attendance_vals)
-                action = 'check_in'
+                action = result['status']
 
             return {
                 'success': True,
                 'action': action,
-                'employee_name': employee.name,
+                'employee_name': employee_ref.name,
                 'timestamp': now.strftime('%Y-%m-%d %H:%M:%S'),
             }
 
+        except (ConcurrencyError, IntegrityError, OperationalError):
+            # Let the request be replayed on a fresh snapshot (serialization
+            # failures, concurrent punches rejected by the unique indexes)
+            raise
         except Exception as e:
             _logger.exception('Error processing attendance check-in/out: %s', str(e))
             return {'success': False, 'error': str(e)}
 
     @http.route(
-        '/my_hr/attendance/status',
+        '/my_hr/attendance/bulk',
         type='jsonrpc',
         auth='user',
         methods=['POST'],
         csrf=True,
     )
-    def get_status(self, **kwargs):
-        """Return current check-in status for the logged-in employee."""
+    def check_in_out_bulk(self, punches=None, **kwargs):
+        """
+        Ingest check-in/check-out punches queued by a device, possibly
+        recorded while offline.
+        Expected JSON payload:
+          - punches (list of dict): client_uid, timestamp (ISO 8601),
+            latitude, longitude, user_agent; photos are uploaded
+            separately to /my_hr/attendance/photo
+        Returns one result per punch; the device drops every punch that has
+        a result, including duplicates and rejections.
+        """
         try:
-            employee = request.env['hr.employee'].search(
-                [('user_id', '=', request.env.uid)], limit=1
-            )
-            if not employee:
-                return {'checked_in': False}
+            punches = (punches or [])[:MAX_BULK_PUNCHES]
+            employee_ref = request.env['hr.employee']._my_hr_current_employee_ref()
+            if not employee_ref:
+                return {'success': False, 'error': 'No employee linked to your user account.'}
 
-            last = request.env['hr.attendance'].search(
-                [('employee_id', '=', employee.id), ('check_out', '=', False)],
-                order='check_in desc',
-                limit=1
+            results = request.env['hr.attendance']._my_hr_ingest_punches(
+                employee_ref, punches, request.httprequest.remote_addr or ''
             )
+            status = request.env['hr.employee'].browse(employee_ref.id)._my_hr_attendance_status()
             return {
-                'checked_in': bool(last),
-                'employee_name': employee.name,
-                'check_in_time': last.check_in.strftime('%H:%M') if last else None,
+                'success': True,
+                'results': results,
+                'status': status,
             }
+
+        except (ConcurrencyError, IntegrityError, OperationalError):
+            # Let the request be replayed on a fresh snapshot (serialization
+            # failures, concurrent punches rejected by the unique indexes)
+            raise
+        except Exception as e:
+            _logger.exception('Error processing queued attendance punches: %s', str(e))
+            return {'success': False, 'error': str(e)}
+
+    @http.route(
+        '/my_hr/attendance/photo',
+        type='http',
+        auth='user',
+        methods=['POST'],
+        csrf=True,
+    )
+    def upload_photo(self, client_uid=None, **kwargs):
+        """
+        Receive the check-in photo of a punch as the raw request body
+        (image/webp), with client_uid and csrf_token in the query string.
+        The body is copied to the filestore in chunks, never decoded or held
+        as a string; it can be sent before or after the punch itself.
+        """
+        employee_ref = request.env['hr.employee']._my_hr_current_employee_ref()
+        if not employee_ref:
+            return request.make_json_response(
+                {'success': False, 'error': 'No employee linked to your user account.'}, status=404
+            )
+        client_uid = (client_uid or '')[:64]
+        if not client_uid:
+            return request.make_json_response(
+                {'success': False, 'error': 'A client_uid is required.'}, status=400
+            )
+        if (request.httprequest.content_length or 0) > MAX_PHOTO_SIZE:
+            return request.make_json_response(
+                {'success': False, 'error': 'The photo is too large.'}, status=413
+            )
+
+        stream = request.httprequest.stream
+        with tempfile.SpooledTemporaryFile(max_size=PHOTO_SPOOL_SIZE) as photo_file:
+            size = 0
+            for chunk in iter(lambda: stream.read(UPLOAD_CHUNK_SIZE), b''):
+                size += len(chunk)
+                if size > MAX_PHOTO_SIZE:
+                    return request.make_json_response(
+                        {'success': False, 'error': 'The photo is too large.'}, status=413
+                    )
+                photo_file.write(chunk)
+            if not size:
+                return request.make_json_response(
+                    {'success': False, 'error': 'The photo is empty.'}, status=400
+                )
+            try:
+                request.env['my_hr.attendance.photo']._my_hr_enqueue(employee_ref.id, client_uid, photo_file)
+            except UserError as e:
+                # Refused for good: a 4xx tells the device not to resend it
+                return request.make_json_response({'success': False, 'error': str(e)}, status=400)
+        return request.make_json_response({'success': True})
+
+    @http.route(
+        '/my_hr/attendance/status',
+        type='jsonrpc',
+        auth='user',
+        methods=['POST'],
+        csrf=True,
+    )
+    def get_status(self, **kwargs):
+        """Return current check-in status for the logged-in employee."""
+        try:
+            employee_ref = request.env['hr.employee']._my_hr_current_employee_ref()
+            if not employee_ref:
+                return {'checked_in': False}
+            return request.env['hr.employee'].browse(employee_ref.id)._my_hr_attendance_status()
         except Exception as e:
             return {'checked_in': False, 'error': str(e)}
\ No newline at end of file
@@ -1,8 +1,9 @@
 # -*- coding: utf-8 -*-
 import logging
-from datetime import date, datetime
 from odoo import http, fields
 from odoo.http import request
+from odoo.addons.my_hr.models.hr_employee_dashboard import MAX_CALENDAR_DAYS
+from odoo.addons.my_hr.models.perf_stat import profiled
 
 _logger = logging.getLogger(__name__)
 
@@ -16,122 +17,59 @@ class DashboardController(http.Controller):
         methods=['POST'],
         csrf=True,
     )
+    @profiled('/my_hr/dashboard/data')
     def get_dashboard_data(self, **kwargs):
         """Return KPI and calendar data for the Employee Dashboard."""
         _logger.debug('Dashboard data called by uid=%s', request.env.uid)
         try:
-            uid = request.env.uid
-            employee = request.env['hr.employee'].search(
-                [('user_id', '=', uid)], limit=1
-            )
-            if not employee:
+            employee_ref = request.env['hr.employee']._my_hr_current_employee_ref()
+            if not employee_ref:
                 return {'error': 'No employee linked to your account.'}
+            employee = request.env['hr.employee'].browse(employee_ref.id)
 
-            today = date.today()
-            month_start = today.replace(day=1)
-            
-            # --- Employee Info ---
-            employee_data = {
-                'id': employee.id,
-                'name': employee.name,
-                'badge_id': employee.barcode or 'N/A',
-                'department': employee.department_id.name if employee.department_id else 'N/A',
-                'department_manager': employee.department_id.manager_id.name if (employee.department_id and employee.department_id.manager_id) else 'N/A',
-                'job_title': employee.job_title or 'N/A',
-            }
-
-            # --- Leave Balance ---
-            annual_leave = request.env['hr.leave.type'].search(
-                [('my_hr_accrual', '=', True)], limit=1
-            )
-            leave_balance = 0.0
-            if annual_leave:
-                allocation = request.env['hr.leave.allocation'].search([
-                    ('employee_id', '=', employee.id),
-                    ('holiday_status_id', '=', annual_leave.id),
-                    ('state', '=', 'validate'),
-                ], limit=1, order='id desc')
-                if allocation:
-                    leave_balance = allocation.number_of_days or 0.0
-
-            # --- Next Pay Date ---
-            # Find latest published batch that includes this month
-            # (gracefully skip if user has no payroll access)
-            next_pay_date = 'N/A'
-            try:
-                next_batch = request.env['my_hr.payroll.batch'].search([
-                    ('state', '=', 'published'),
-                    ('date_to', '>=', today.strftime('%Y-%m-%d')),
-                ], order='date_to asc', limit=1)
-                next_pay_date = next_batch.date_to.strftime('%d %b %Y') if next_batch else 'N/A'
-            except Exception as e:
-                _logger.debug('Could not fetch payroll batch (user may lack permissions): %s', str(e))
-
-            # --- Hours Worked This Month ---
-            attendances = request.env['hr.attendance'].search([
-                ('employee_id', '=', employee.id),
-                ('check_in', '>=', datetime.combine(month_start, datetime.min.time())),
-            ])
-            total_hours = round(sum(a.worked_hours for a in attendances), 2)
-
-            # --- Calendar Events ---
-            calendar_events = []
-            for att in attendances:
-                calendar_events.append({
-                    'type': 'attendance',
-                    'date': att.check_in.strftime('%Y-%m-%d'),
-                    'check_in': att.check_in.strftime('%H:%M'),
-                    'check_out': att.check_out.strftime('%H:%M') if att.check_out else None,
-                    'hours': round(att.worked_hours, 2),
-                })
-
-            # Public holidays (global leaves)
-            public_holidays = request.env['hr.leave.public.holiday'].search(
-                [('active', '=', True)]
-            ) if 'hr.leave.public.holiday' in request.env else []
-            # Fallback: use hr.leave type
-            leaves_off = request.env['hr.leave'].search([
-                ('employee_id', '=', employee.id),
-                ('state', '=', 'validate'),
-                ('date_from', '>=', datetime.combine(month_start, datetime.min.time())),
-            ])
-            for leave in leaves_off:
-                calendar_events.append({
-                    'type': 'leave',
-                    'date': leave.date_from.strftime('%Y-%m-%d'),
-                    'label': leave.holiday_status_id.name or 'Time Off',
-                })
-
-            # --- Recent Payslips ---
-            # (gracefully skip if user has no payroll access)
-            payslip_list = []
-            try:
-                payslips = request.env['my_hr.payslip'].search([
-                    ('employee_id', '=', employee.id),
-                    ('state', '=', 'confirmed'),
-                ], order='date_from desc', limit=12)
-                payslip_list = [{
-                    'id': p.id,
-                    'name': p.display_name,
-                    'date': p.date_from.strftime('%B %Y'),
-                    'net_salary': p.net_salary,
-                    'currency': p.currency_id.symbol or '',
-                } for p in payslips]
-            except Exception as e:
-                _logger.debug('Could not fetch payslips (user may lack permissions): %s', str(e))
-
-            result = {
-                'success': True,
-                'employee': employee_data,
-                'employee_name': employee.name,
-                'leave_balance': leave_balance,
-                'next_pay_date': next_pay_date,
-                'total_hours': total_hours,
-                'calendar_events': calendar_events,
-                'payslips': payslip_list,
-            }
+            result = dict(employee._get_my_hr_dashboard_data(), success=True)
             _logger.debug('Dashboard data result: %s', result)
             return result
         except Exception as e:
             _logger.exception('Dashboard data error: %s', e)
-            return {'success': False, 'error': str(e)}
\ No newline at end of file
+            return {'success': False, 'error': str(e)}
+
+    @http.route(
+        '/my_hr/dashboard/calendar',
+        type='http',
+        auth='user',
+        methods=['GET'],
+    )
+    def get_calendar(self, date_from=None, date_to=None, **kwargs):
+        """
+        Return the calendar events of a date range as columnar arrays.
+        Responses carry an ETag; an unchanged range answers 304 without
+        loading the events.
+        """
+        employee_ref = request.env['hr.employee']._my_hr_current_employee_ref()
+        if not employee_ref:
+            return request.make_json_response(
+                {'success': False, 'error': 'No employee linked to your account.'}, status=404
+            )
+        try:
+            date_from = fields.Date.to_date(date_from)
+            date_to = fields.Date.to_date(date_to)
+        except ValueError:
+            date_from = date_to = None
+        if not date_from or not date_to or date_from > date_to:
+            return request.make_json_response(
+                {'success': False, 'error': 'A valid date_from and date_to are required.'}, status=400
+            )
+        if (date_to - date_from).days + 1 > MAX_CALENDAR_DAYS:
+            return request.make_json_response(
+                {'success': False, 'error': f'The range cannot exceed {MAX_CALENDAR_DAYS} days.'}, status=400
+            )
+
+        employee = request.env['hr.employee'].browse(employee_ref.id)
+        etag = employee._get_my_hr_calendar_etag(date_from, date_to)
+        headers = [('ETag', f'"{etag}"'), ('Cache-Control', 'private, no-cache')]
+        if request.httprequest.if_none_match.contains(etag):
+            return request.make_response(b'', headers=headers, status=304)
+
+        data = employee._get_my_hr_calendar_data(date_from, date_to)
+        return request.make_json_response(dict(data, success=True), headers=headers)
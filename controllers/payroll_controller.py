@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+import logging
+
+from odoo import http
+from odoo.http import request
+
+_logger = logging.getLogger(__name__)
+
+
+class PayrollController(http.Controller):
+
+    @http.route(
+        '/my_hr/payroll/wps/<int:batch_id>',
+        type='http',
+        auth='user',
+        methods=['GET'],
+    )
+    def download_wps(self, batch_id, **kwargs):
+        """Stream the exported WPS file of a payroll batch from the filestore."""
+        batch = request.env['my_hr.payroll.batch'].browse(batch_id).exists()
+        if not batch:
+            raise request.not_found()
+        batch.check_access('read')
+        attachment = batch.sudo().wps_attachment_id
+        if not attachment:
+            raise request.not_found()
+        stream = request.env['ir.binary']._get_stream_from(attachment)
+        return stream.get_response(as_attachment=True)
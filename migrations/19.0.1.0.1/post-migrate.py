@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+
+
+def migrate(cr, version):
+    """Payslips are no longer computed in a worker pool: drop its setting."""
+    cr.execute("DELETE FROM ir_config_parameter WHERE key = 'my_hr.payroll_workers'")
@@ -1,8 +1,19 @@
 # -*- coding: utf-8 -*-
+from . import ormcache
+from . import perf_stat
 from . import hr_office_geofence
 from . import hr_employee
+from . import hr_employee_dashboard
 from . import hr_attendance
+from . import hr_attendance_photo
+from . import hr_attendance_daily
 from . import payroll_batch
 from . import payslip
+from . import payroll_report
+from . import payroll_variance
 from . import hr_task
-from . import hr_leave_accrual
\ No newline at end of file
+from . import hr_leave_accrual
+from . import res_config_settings
+from . import ir_attachment
+from . import geofence_audit
+from . import ir_http
\ No newline at end of file
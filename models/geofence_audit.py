@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+import logging
+import time
+from odoo import api, fields, models
+from odoo.tools import html_escape
+from odoo.exceptions import UserError
+from .hr_office_geofence import EARTH_RADIUS
+
+_logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+    _logger.info('my_hr: numpy not available, geofence audit falls back to the grid index.')
+
+# Distance matrix cells computed per chunk (rows x offices)
+MATRIX_CELLS_PER_CHUNK = 2000000
+
+
+def _match_points_numpy(lats, lons, office_lats, office_lons, office_radii, allowed):
+    """
+    Vectorized Haversine distance matrix between points and offices,
+    ``allowed`` masking the offices each point may match.
+    Returns (office index, distance) arrays; the index is -1 when the
+    point is outside every allowed office radius.
+    """
+    lat = np.radians(np.asarray(lats, dtype=float))[:, None]
+    lon = np.radians(np.asarray(lons, dtype=float))[:, None]
+    olat = np.radians(office_lats)[None, :]
+    olon = np.radians(office_lons)[None, :]
+
+    a = (np.sin((olat - lat) / 2) ** 2 +
+         np.cos(lat) * np.cos(olat) * np.sin((olon - lon) / 2) ** 2)
+    distances = 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+    distances[(distances > office_radii[None, :]) | ~allowed] = np.inf
+
+    nearest = np.argmin(distances, axis=1)
+    nearest_distance = distances[np.arange(len(nearest)), nearest]
+    nearest[~np.isfinite(nearest_distance)] = -1
+    return nearest, nearest_distance
+
+
+class MyHrGeofenceAudit(models.TransientModel):
+    _name = 'my_hr.geofence.audit'
+    _description = 'Geofence Audit of Attendances'
+
+    company_id = fields.Many2one(
+        'res.company', string='Company',
+        default=lambda self: self.env.company,
+        required=True
+    )
+    date_from = fields.Date(string='From', required=True)
+    date_to = fields.Date(string='To', required=True, default=fields.Date.today)
+    state = fields.Selection([
+        ('draft', 'Draft'),
+        ('done', 'Done'),
+    ], default='draft')
+    checked_count = fields.Integer(string='Attendances Checked', readonly=True)
+    inside_count = fields.Integer(string='Inside a Geofence', readonly=True)
+    outside_count = fields.Integer(string='Outside All Geofences', readonly=True)
+    no_location_count = fields.Integer(string='Without GPS Location', readonly=True)
+    changed_count = fields.Integer(string='Attendances Updated', readonly=True)
+    summary = fields.Html(string='Summary', readonly=True, sanitize=True)
+
+    def action_run_audit(self):
+        self.ensure_one()
+        if self.date_from > self.date_to:
+            raise UserError('The end date must be after the start date.')
+        stats = self._run_audit(self.company_id, self.date_from, self.date_to)
+        self.write(dict(
+            {key: stats[key] for key in (
+                'checked_count', 'inside_count', 'outside_count',
+                'no_location_count', 'changed_count',
+            )},
+            state='done',
+            summary=self._render_summary(stats),
+        ))
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
+
+    @api.model
+    def _run_audit(self, company, date_from, date_to):
+        """
+        Re-check the check-in coordinates of every attendance of the company
+        in the period against the current active geofences, writing back
+        geofence_id and outside_geofence where they changed.
+        The candidate offices are the ones the punch was checked against
+        (see _find_nearest_geofence): the employee's allowed offices, of any
+        company, or else the offices of the company.
+        Attendances are streamed in id order, one chunk at a time.
+        Can also be called from a shell or a scheduled action for long ranges.
+        """
+        started = time.monotonic()
+        self.env['hr.attendance'].flush_model(['geofence_id', 'outside_geofence'])
+        self.env.cr.execute("""
+            SELECT r.employee_id, array_agg(r.geofence_id)
+              FROM hr_employee_geofence_rel r
+              JOIN hr_employee e ON e.id = r.employee_id
+              JOIN hr_office_geofence g ON g.id = r.geofence_id
+             WHERE e.company_id = %s AND g.active
+          GROUP BY r.employee_id
+        """, (company.id,))
+        allowed_by_employee = dict(self.env.cr.fetchall())
+        Geofence = self.env['hr.office.geofence'].sudo()
+        company_offices = Geofence.search([('company_id', '=', company.id)])
+        offices = company_offices | Geofence.browse(
+            list({office_id for office_ids in allowed_by_employee.values() for office_id in office_ids})
+        )
+        if not offices:
+            raise UserError('There are no active office geofences to audit against.')
+        offices.fetch(['name', 'latitude', 'longitude', 'radius'])
+
+        office_ids = offices.ids
+        if np is not None:
+            office_lats = np.array(offices.mapped('latitude'), dtype=float)
+            office_lons = np.array(offices.mapped('longitude'), dtype=float)
+            office_radii = np.array(offices.mapped('radius'), dtype=float)
+            company_mask = np.isin(office_ids, company_offices.ids)
+            mask_by_employee = {
+                employee_id: np.isin(office_ids, allowed_ids)
+                for employee_id, allowed_ids in allowed_by_employee.items()
+            }
+
+        stats = {
+            'checked_count': 0, 'inside_count': 0, 'outside_count': 0,
+            'no_location_count': 0, 'changed_count': 0,
+            'per_office': dict.fromkeys(office_ids, 0),
+        }
+        chunk_size = max(1000, MATRIX_CELLS_PER_CHUNK // len(office_ids))
+        last_id = 0
+        changed_ids = []
+        while True:
+            self.env.cr.execute("""
+                SELECT a.id, a.check_in_latitude, a.check_in_longitude,
+                       a.geofence_id, a.outside_geofence, a.employee_id
+                  FROM hr_attendance a
+                  JOIN hr_employee e ON e.id = a.employee_id
+                 WHERE a.id > %s
+                   AND e.company_id = %s
+                   AND a.check_in >= %s
+                   AND a.check_in < %s::date + 1
+              ORDER BY a.id
+                 LIMIT %s
+            """, (last_id, company.id, date_from, date_to, chunk_size))
+            rows = self.env.cr.fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            stats['checked_count'] += len(rows)
+
+            located = [row for row in rows if row[1] or row[2]]
+            stats['no_location_count'] += len(rows) - len(located)
+            if not located:
+                continue
+
+            if np is not None:
+                nearest, _distances = _match_points_numpy(
+                    [row[1] for row in located], [row[2] for row in located],
+                    office_lats, office_lons, office_radii,
+                    np.array([mask_by_employee.get(row[5], company_mask) for row in located]),
+                )
+                matches = [office_ids[i] if i >= 0 else None for i in nearest.tolist()]
+            else:
+                matches = [
+                    Geofence._find_nearest_geofence(
+                        row[1], row[2], allowed_by_employee.get(row[5]), company_id=company.id
+                    )[0] or None
+                    for row in located
+                ]
+
+            updates = []
+            for (att_id, _lat, _lon, geofence_id, outside, _employee_id), match in zip(located, matches):
+                if match:
+                    stats['inside_count'] += 1
+                    stats['per_office'][match] += 1
+                else:
+                    stats['outside_count'] += 1
+                is_outside = match is None
+                if geofence_id != match or bool(outside) != is_outside:
+                    updates.append((att_id, match, is_outside))
+
+            if updates:
+                ids, geofence_ids, outside_flags = zip(*updates)
+                self.env.cr.execute("""
+                    UPDATE hr_attendance a
+                       SET geofence_id = v.geofence_id,
+                           outside_geofence = v.outside
+                      FROM unnest(%s::int[], %s::int[], %s::bool[]) AS v(id, geofence_id, outside)
+                     WHERE a.id = v.id
+                """, (list(ids), list(geofence_ids), list(outside_flags)))
+                stats['changed_count'] += len(updates)
+                changed_ids.extend(ids)
+
+        self.env['hr.attendance'].invalidate_model(['geofence_id', 'outside_geofence'])
+        # The matched office of the daily summary follows the first check-in
+        for offset in range(0, len(changed_ids), chunk_size):
+            self.env['my_hr.attendance.daily']._refresh(
+                self.env['hr.attendance'].browse(changed_ids[offset:offset + chunk_size])._my_hr_daily_keys()
+            )
+        stats['office_names'] = dict(zip(office_ids, offices.mapped('name')))
+        stats['duration'] = time.monotonic() - started
+        _logger.info(
+            'my_hr geofence audit: company %s, %s attendances checked, %s outside, %s updated in %.1fs',
+            company.id, stats['checked_count'], stats['outside_count'],
+            stats['changed_count'], stats['duration'],
+        )
+        return stats
+
+    @api.model
+    def _render_summary(self, stats):
+        rows = ''.join(
+            f"<tr><td>{html_escape(stats['office_names'][office_id])}</td><td class='text-end'>{count}</td></tr>"
+            for office_id, count in sorted(stats['per_office'].items(), key=lambda item: -item[1])
+        )
+        return (
+            f"<p>Audit completed in {stats['duration']:.1f} s.</p>"
+            f"<table class='table table-sm'>"
+            f"<thead><tr><th>Office</th><th class='text-end'>Attendances</th></tr></thead>"
+            f"<tbody>{rows}</tbody></table>"
+        )
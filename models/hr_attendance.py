@@ -1,5 +1,31 @@
 # -*- coding: utf-8 -*-
-from odoo import fields, models
+import base64
+import binascii
+import io
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+import psycopg2.errors
+from odoo import api, fields, models
+from odoo.exceptions import ConcurrencyError, UserError
+
+_logger = logging.getLogger(__name__)
+
+# Fields whose change affects the worked hours used by payroll
+PAYROLL_FIELDS = {'employee_id', 'check_in', 'check_out'}
+# Fields whose change affects the systray check-in status
+STATUS_FIELDS = {'employee_id', 'check_out'}
+# Fields whose change affects the daily attendance summary
+DAILY_FIELDS = {'employee_id', 'check_in', 'check_out', 'geofence_id'}
+
+# Queued punches older than this are refused by the bulk ingest
+MAX_PUNCH_AGE = timedelta(days=7)
+# Punches received longer than this after their device time are flagged for review
+MAX_PUNCH_DELAY = timedelta(minutes=30)
+# Tolerated device clock drift into the future
+MAX_CLOCK_DRIFT = timedelta(minutes=5)
+# First key of the per-employee advisory lock taken around punches
+PUNCH_LOCK_NAMESPACE = 0x6d79_6872  # 'myhr'
 
 
 class HrAttendance(models.Model):
@@ -9,6 +35,11 @@ class HrAttendance(models.Model):
         string='Check-in Photo',
         attachment=True
     )
+    check_in_photo_thumbnail = fields.Image(
+        string='Check-in Photo Thumbnail',
+        attachment=True,
+        readonly=True
+    )
     check_in_latitude = fields.Float(
         string='Check-in Latitude',
         digits=(10, 7)
@@ -23,4 +54,295 @@ class HrAttendance(models.Model):
         'hr.office.geofence',
         string='Matched Office',
         readonly=True
-    )
\ No newline at end of file
+    )
+    outside_geofence = fields.Boolean(
+        string='Outside Geofence',
+        readonly=True,
+        index=True,
+        help='Set by the geofence audit when the check-in location is outside every office radius.'
+    )
+    check_in_client_uid = fields.Char(
+        string='Check-in Client ID',
+        readonly=True,
+        copy=False,
+        help='Identifier generated by the device for the check-in punch, used to ignore resent punches.'
+    )
+    check_out_client_uid = fields.Char(
+        string='Check-out Client ID',
+        readonly=True,
+        copy=False,
+        help='Identifier generated by the device for the check-out punch, used to ignore resent punches.'
+    )
+
+    check_in_received_at = fields.Datetime(
+        string='Check-in Received',
+        readonly=True,
+        copy=False,
+        help='Server time at which the check-in punch was received.'
+    )
+    check_out_received_at = fields.Datetime(
+        string='Check-out Received',
+        readonly=True,
+        copy=False,
+        help='Server time at which the check-out punch was received.'
+    )
+    late_punch = fields.Boolean(
+        string='Late Synced Punch',
+        readonly=True,
+        copy=False,
+        index=True,
+        help='A punch of this attendance reached the server well after its device time '
+             '(recorded offline, or a device clock set back) and should be reviewed.'
+    )
+
+    _check_in_client_uid_uniq = models.UniqueIndex(
+        '(check_in_client_uid) WHERE check_in_client_uid IS NOT NULL'
+    )
+    _check_out_client_uid_uniq = models.UniqueIndex(
+        '(check_out_client_uid) WHERE check_out_client_uid IS NOT NULL'
+    )
+    # At most one open attendance per employee, enforced by PostgreSQL: the
+    # punch lock alone cannot, as a waiting request still reads the snapshot
+    # taken before it got the lock. Also the open attendance lookup of the
+    # check-in toggle and systray status.
+    _my_hr_open_attendance_idx = models.UniqueIndex('(employee_id) WHERE check_out IS NULL')
+    # Last attendance of an employee, when none is open
+    _my_hr_employee_check_in_idx = models.Index('(employee_id, check_in DESC)')
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        attendances = super().create(vals_list)
+        self.env['my_hr.attendance.daily']._refresh(attendances._my_hr_daily_keys())
+        attendances._mark_payslips_stale()
+        self.env['hr.employee']._my_hr_invalidate_dashboard(attendances.employee_id.ids)
+        attendances.employee_id._my_hr_notify_attendance_status()
+        return attendances
+
+    def write(self, vals):
+        payroll_change = bool(PAYROLL_FIELDS & vals.keys())
+        if payroll_change:
+            # Old employee/date, in case they are being changed
+            self._mark_payslips_stale()
+        old_employees = self.employee_id
+        daily_keys = self._my_hr_daily_keys() if DAILY_FIELDS & vals.keys() else None
+        res = super().write(vals)
+        if daily_keys is not None:
+            self.env['my_hr.attendance.daily']._refresh(daily_keys | self._my_hr_daily_keys())
+        if payroll_change:
+            self._mark_payslips_stale()
+        employees = old_employees | self.employee_id
+        self.env['hr.employee']._my_hr_invalidate_dashboard(employees.ids)
+        if STATUS_FIELDS & vals.keys():
+            employees._my_hr_notify_attendance_status()
+        return res
+
+    def unlink(self):
+        self._mark_payslips_stale()
+        self.env['hr.employee']._my_hr_invalidate_dashboard(self.employee_id.ids)
+        daily_keys = self._my_hr_daily_keys()
+        res = super().unlink()
+        self.env['my_hr.attendance.daily']._refresh(daily_keys)
+        return res
+
+    def _my_hr_daily_keys(self):
+        """(employee_id, date) keys of the daily summary rows of these attendances."""
+        return {
+            (att.employee_id.id, att.check_in.date())
+            for att in self if att.employee_id and att.check_in
+        }
+
+    def _mark_payslips_stale(self):
+        employee_dates = defaultdict(set)
+        for att in self:
+            if att.employee_id and att.check_in:
+                employee_dates[att.employee_id.id].add(att.check_in.date())
+        self.env['my_hr.payslip']._mark_stale(employee_dates)
+
+    @api.model
+    def _my_hr_lock_employee(self, employee_id):
+        """Hold a per-employee advisory lock until the end of the transaction."""
+        self.env.cr.execute(
+            'SELECT pg_advisory_xact_lock(%s, %s)', (PUNCH_LOCK_NAMESPACE, employee_id)
+        )
+
+    @api.model
+    def _my_hr_parse_punch_time(self, value):
+        """Parse a device ISO 8601 timestamp into a naive UTC datetime."""
+        stamp = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+        if stamp.tzinfo:
+            stamp = stamp.astimezone(timezone.utc).replace(tzinfo=None)
+        return stamp.replace(microsecond=0)
+
+    @api.model
+    def _my_hr_ingest_punches(self, employee_ref, punches, ip_address=''):
+        """
+        Apply a batch of check-in/check-out punches recorded by a device,
+        in device time order.
+        Each punch is a dict with client_uid, timestamp (ISO 8601), latitude,
+        longitude, and optionally photo (base64) and user_agent. Punches whose
+        client_uid was already ingested are reported as duplicates, so a
+        device can safely resend its queue. New attendances are created in
+        one call and the open attendance, if any, is closed in one write.
+        Photos are only stored here, see my_hr.attendance.photo.
+        A client_uid repeated within the payload is only applied once.
+        Returns one {'client_uid', 'status'[, 'error']} result per client_uid,
+        status being check_in, check_out, duplicate or rejected.
+        The device time is only trusted for the order and the times of the
+        punches: the receipt time is stored too, and attendances with a
+        punch received more than MAX_PUNCH_DELAY after its device time are
+        flagged as late_punch for review.
+        """
+        Geofence = self.env['hr.office.geofence']
+        now = fields.Datetime.now()
+        results = {}
+        valid = []
+        received = {}  # client_uids in payload order, each once
+        for punch in punches:
+            client_uid = str(punch.get('client_uid') or '')[:64]
+            if not client_uid or client_uid in received:
+                continue
+            received[client_uid] = True
+            try:
+                stamp = self._my_hr_parse_punch_time(punch['timestamp'])
+                latitude = float(punch.get('latitude') or 0)
+                longitude = float(punch.get('longitude') or 0)
+            except (KeyError, TypeError, ValueError):
+                results[client_uid] = {'status': 'rejected', 'error': 'Invalid punch data.'}
+                continue
+            if stamp > now + MAX_CLOCK_DRIFT or stamp < now - MAX_PUNCH_AGE:
+                results[client_uid] = {'status': 'rejected', 'error': 'Punch time is out of the accepted range.'}
+                continue
+
+            # Geofence validation
+            matched_office_id = False
+            if employee_ref.office_ids:
+                matched_office_id, _distance = Geofence._find_nearest_geofence(
+                    latitude, longitude, employee_ref.office_ids, employee_ref.company_id
+                )
+                if not matched_office_id:
+                    results[client_uid] = {
+                        'status': 'rejected',
+                        'error': 'You were outside the allowed office area.',
+                    }
+                    continue
+            valid.append((stamp, client_uid, latitude, longitude, matched_office_id, punch))
+
+        # Punches of one employee (double taps, several tabs or devices)
+        # are applied one request at a time. The request waiting for the lock
+        # may still see the state before the other one committed: the unique
+        # indexes then reject its attendance and the request is replayed.
+        self._my_hr_lock_employee(employee_ref.id)
+
+        # Dedupe against punches already ingested
+        uids = [item[1] for item in valid]
+        known = self.sudo().search_fetch(
+            ['|', ('check_in_client_uid', 'in', uids), ('check_out_client_uid', 'in', uids)],
+            ['check_in_client_uid', 'check_out_client_uid'],
+        ) if uids else self.browse()
+        seen = set(known.mapped('check_in_client_uid')) | set(known.mapped('check_out_client_uid'))
+
+        last = self.search_fetch(
+            [('employee_id', '=', employee_ref.id), ('check_out', '=', False)],
+            ['check_in', 'late_punch'],
+            limit=1,
+        )
+        open_attendance = last or None
+        if not last:
+            last = self.search_fetch(
+                [('employee_id', '=', employee_ref.id)],
+                ['check_in', 'check_out'],
+                order='check_in desc',
+                limit=1,
+            )
+        last_time = max(filter(None, [last.check_in, last.check_out]), default=None)
+        pending = None  # vals of the last new attendance, while still open
+        to_create = []
+        check_out_vals = None
+        photos = []
+
+        for stamp, client_uid, latitude, longitude, matched_office_id, punch in sorted(valid, key=lambda item: item[:2]):
+            if client_uid in seen:
+                results[client_uid] = {'status': 'duplicate'}
+                continue
+            seen.add(client_uid)
+            if last_time and stamp <= last_time:
+                results[client_uid] = {'status': 'rejected', 'error': 'A later punch is already recorded.'}
+                continue
+            last_time = stamp
+            late = stamp < now - MAX_PUNCH_DELAY
+
+            if open_attendance is not None:
+                check_out_vals = {
+                    'check_out': stamp,
+                    'check_out_client_uid': client_uid,
+                    'check_out_received_at': now,
+                    'late_punch': open_attendance.late_punch or late,
+                }
+                open_attendance = None
+                results[client_uid] = {'status': 'check_out'}
+            elif pending is not None:
+                pending.update(
+                    check_out=stamp,
+                    check_out_client_uid=client_uid,
+                    check_out_received_at=now,
+                    late_punch=pending['late_punch'] or late,
+                )
+                pending = None
+                results[client_uid] = {'status': 'check_out'}
+            else:
+                pending = {
+                    'employee_id': employee_ref.id,
+                    'check_in': stamp,
+                    'check_in_client_uid': client_uid,
+                    'check_in_received_at': now,
+                    'late_punch': late,
+                    'check_in_latitude': latitude,
+                    'check_in_longitude': longitude,
+                    'ip_address': ip_address,
+                    'device_info': str(punch.get('user_agent') or '')[:255],
+                    'geofence_id': matched_office_id,
+                }
+                photo_b64 = punch.get('photo')
+                if photo_b64:
+                    photos.append((client_uid, photo_b64))
+                to_create.append(pending)
+                results[client_uid] = {'status': 'check_in'}
+
+        try:
+            if check_out_vals:
+                last.write(check_out_vals)
+            if to_create:
+                self.create(to_create)
+            self.flush_model()
+        except psycopg2.errors.UniqueViolation as e:
+            # A concurrent request ingested the same punch or opened an
+            # attendance since our snapshot was taken: retry on fresh data
+            raise ConcurrencyError('Concurrent attendance punches, retrying.') from e
+        # Photos are stored now and validated/linked by the photo cron
+        for client_uid, photo_b64 in photos:
+            self._my_hr_queue_photo(employee_ref.id, client_uid, photo_b64)
+        Photo = self.env['my_hr.attendance.photo']
+        if to_create:
+            # Photos uploaded ahead of their punch can be linked right away
+            Photo._my_hr_trigger_pending([vals['check_in_client_uid'] for vals in to_create])
+        # Photos of punches answered otherwise will never have a check-in
+        Photo._my_hr_discard([
+            uid for uid, result in results.items() if result['status'] in ('check_out', 'rejected')
+        ])
+
+        return [dict(results[client_uid], client_uid=client_uid) for client_uid in received]
+
+    @api.model
+    def _my_hr_queue_photo(self, employee_id, client_uid, photo_b64):
+        """Queue a base64 check-in photo for asynchronous processing."""
+        try:
+            data = base64.b64decode(photo_b64, validate=True)
+        except (binascii.Error, ValueError):
+            _logger.warning('Invalid photo data received from user %s', self.env.uid)
+            return
+        # A photo that cannot be stored must not cost the punch itself
+        try:
+            with self.env.cr.savepoint():
+                self.env['my_hr.attendance.photo']._my_hr_enqueue(employee_id, client_uid, io.BytesIO(data))
+        except (UserError, OSError):
+            _logger.warning('Could not store the check-in photo of punch %s', client_uid, exc_info=True)
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+import logging
+from odoo import api, fields, models
+
+_logger = logging.getLogger(__name__)
+
+# Attendance fields the summary is computed from
+DAILY_SOURCE_FIELDS = ['employee_id', 'check_in', 'check_out', 'worked_hours', 'geofence_id']
+
+# Aggregates of the attendances of one employee on one day (check-in date)
+DAILY_SELECT = """
+    SELECT a.employee_id,
+           a.check_in::date,
+           COALESCE(SUM(a.worked_hours), 0),
+           MIN(a.check_in),
+           MAX(a.check_out),
+           (ARRAY_AGG(a.geofence_id ORDER BY a.check_in))[1],
+           COUNT(a.check_in) + COUNT(a.check_out),
+           %(uid)s, NOW() AT TIME ZONE 'UTC', %(uid)s, NOW() AT TIME ZONE 'UTC'
+      FROM hr_attendance a
+"""
+DAILY_COLUMNS = """
+    (employee_id, date, worked_hours, first_check_in, last_check_out,
+     geofence_id, punch_count, create_uid, create_date, write_uid, write_date)
+"""
+
+
+class HrAttendanceDaily(models.Model):
+    _name = 'my_hr.attendance.daily'
+    _description = 'Daily Attendance Summary'
+    _order = 'date desc, employee_id'
+    _rec_name = 'employee_id'
+
+    employee_id = fields.Many2one(
+        'hr.employee',
+        string='Employee',
+        required=True,
+        readonly=True,
+        index=True,
+        ondelete='cascade'
+    )
+    date = fields.Date(string='Date', required=True, readonly=True, index=True)
+    worked_hours = fields.Float(string='Worked Hours', readonly=True, digits=(16, 2))
+    first_check_in = fields.Datetime(string='First Check-in', readonly=True)
+    last_check_out = fields.Datetime(string='Last Check-out', readonly=True)
+    geofence_id = fields.Many2one(
+        'hr.office.geofence',
+        string='Matched Office',
+        readonly=True,
+        ondelete='set null',
+        help='Office matched by the first check-in of the day.'
+    )
+    punch_count = fields.Integer(string='Punches', readonly=True, aggregator='sum')
+
+    _employee_date_uniq = models.Constraint(
+        'UNIQUE(employee_id, date)',
+        'There can only be one daily summary per employee and day.',
+    )
+
+    def init(self):
+        # Fill the table when the module is installed or upgraded onto
+        # existing attendances; afterwards it is kept up to date incrementally.
+        self.env.cr.execute("SELECT 1 FROM my_hr_attendance_daily LIMIT 1")
+        if not self.env.cr.fetchone():
+            self._rebuild()
+
+    @api.model
+    def _refresh(self, keys):
+        """
+        Recompute the summary rows of the given (employee_id, date) keys
+        from hr_attendance, removing the rows of days left without
+        attendances. Two statements whatever the number of keys.
+        """
+        keys = {key for key in keys if key[0] and key[1]}
+        if not keys:
+            return
+        self.env['hr.attendance'].flush_model(DAILY_SOURCE_FIELDS)
+        employee_ids, dates = zip(*keys)
+        params = {'uid': self.env.uid, 'employee_ids': list(employee_ids), 'dates': list(dates)}
+        self.env.cr.execute("""
+            DELETE FROM my_hr_attendance_daily d
+             USING unnest(%(employee_ids)s::int[], %(dates)s::date[]) AS k(employee_id, date)
+             WHERE d.employee_id = k.employee_id AND d.date = k.date
+        """, params)
+        self.env.cr.execute(f"""
+            INSERT INTO my_hr_attendance_daily {DAILY_COLUMNS}
+            {DAILY_SELECT}
+              JOIN unnest(%(employee_ids)s::int[], %(dates)s::date[]) AS k(employee_id, date)
+                ON a.employee_id = k.employee_id AND a.check_in::date = k.date
+          GROUP BY a.employee_id, a.check_in::date
+                ON CONFLICT (employee_id, date) DO UPDATE
+               SET worked_hours = EXCLUDED.worked_hours,
+                   first_check_in = EXCLUDED.first_check_in,
+                   last_check_out = EXCLUDED.last_check_out,
+                   geofence_id = EXCLUDED.geofence_id,
+                   punch_count = EXCLUDED.punch_count,
+                   write_uid = EXCLUDED.write_uid,
+                   write_date = EXCLUDED.write_date
+        """, params)
+        self.invalidate_model()
+
+    @api.model
+    def _rebuild(self):
+        """Recompute the whole summary table from hr_attendance."""
+        self.env['hr.attendance'].flush_model(DAILY_SOURCE_FIELDS)
+        self.env.cr.execute("DELETE FROM my_hr_attendance_daily")
+        self.env.cr.execute(f"""
+            INSERT INTO my_hr_attendance_daily {DAILY_COLUMNS}
+            {DAILY_SELECT}
+             WHERE a.employee_id IS NOT NULL
+          GROUP BY a.employee_id, a.check_in::date
+        """, {'uid': self.env.uid})
+        _logger.info('my_hr: daily attendance summary rebuilt, %s rows', self.env.cr.rowcount)
+        self.invalidate_model()
+
+    @api.model
+    def action_rebuild(self):
+        self._rebuild()
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': 'Daily Summary Rebuilt',
+                'message': 'The daily attendance summary was recomputed from all attendances.',
+                'type': 'success',
+            }
+        }
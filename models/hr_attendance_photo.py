@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+import base64
+import logging
+import threading
+from odoo import api, fields, models
+from odoo.exceptions import UserError
+from odoo.tools.image import image_process
+
+from .hr_attendance import MAX_PUNCH_AGE
+
+_logger = logging.getLogger(__name__)
+
+# Photos processed per cron run, committed one chunk at a time
+PHOTO_BATCH_SIZE = 200
+PHOTO_CHUNK_SIZE = 50
+THUMBNAIL_SIZE = (128, 128)
+
+
+class HrAttendancePhoto(models.Model):
+    _name = 'my_hr.attendance.photo'
+    _description = 'Attendance Photo Upload'
+    _order = 'id'
+
+    client_uid = fields.Char(
+        string='Client ID',
+        required=True,
+        readonly=True,
+        help='Client ID of the check-in punch the photo was taken for.'
+    )
+    employee_id = fields.Many2one(
+        'hr.employee',
+        string='Employee',
+        required=True,
+        readonly=True,
+        ondelete='cascade'
+    )
+    attachment_id = fields.Many2one(
+        'ir.attachment',
+        string='Stored File',
+        readonly=True,
+        ondelete='set null'
+    )
+    checksum = fields.Char(string='Checksum', readonly=True, index=True)
+    attendance_id = fields.Many2one(
+        'hr.attendance',
+        string='Attendance',
+        readonly=True,
+        ondelete='cascade'
+    )
+    state = fields.Selection([
+        ('pending', 'Pending'),
+        ('done', 'Done'),
+        ('invalid', 'Invalid'),
+    ], string='Status', default='pending', required=True, readonly=True, index=True)
+    attempted_at = fields.Datetime(
+        string='Last Attempt',
+        readonly=True,
+        help='Set when the photo cron found no check-in for the photo yet; it is '
+             'tried again once its punch is ingested.'
+    )
+
+    _client_uid_uniq = models.UniqueIndex('(client_uid)')
+
+    @api.model
+    def _my_hr_enqueue(self, employee_id, client_uid, fileobj):
+        """
+        Store an uploaded check-in photo and queue it for processing.
+        The file goes to the filestore under its sha1, so identical uploads
+        share one file, and resending a photo for the same punch is a no-op.
+        """
+        photo = self.sudo().search([('client_uid', '=', client_uid)], limit=1)
+        if photo:
+            return photo
+        attachment = self.env['ir.attachment'].sudo()._my_hr_create_from_file(fileobj, {
+            'name': f'checkin_{client_uid}.webp',
+            'res_model': self._name,
+            'mimetype': 'image/webp',
+        })
+        photo = self.sudo().create({
+            'client_uid': client_uid,
+            'employee_id': employee_id,
+            'attachment_id': attachment.id,
+            'checksum': attachment.checksum,
+        })
+        attachment.res_id = photo.id
+        self.env.ref('my_hr.ir_cron_attendance_photo').sudo()._trigger()
+        return photo
+
+    @api.model
+    def _my_hr_trigger_pending(self, client_uids):
+        """Queue again the photos waiting for these check-ins, and run the photo cron."""
+        photos = self.sudo().search([('client_uid', 'in', client_uids), ('state', '=', 'pending')])
+        if photos:
+            photos.attempted_at = False
+            self.env.ref('my_hr.ir_cron_attendance_photo').sudo()._trigger()
+
+    @api.model
+    def _my_hr_discard(self, client_uids):
+        """Drop the photos of punches that did not become a check-in."""
+        photos = self.sudo().search([('client_uid', 'in', client_uids), ('state', '=', 'pending')])
+        photos.attachment_id.unlink()
+        photos.state = 'invalid'
+
+    @api.model
+    def _cron_process_photos(self):
+        """
+        Validate pending photos, link them to their check-in and build the
+        thumbnail. Photos whose punch has not been ingested yet are set
+        aside (attempted_at) until the punch arrives, so they never hold
+        up the queue, and are removed once the punch is too old to arrive.
+        """
+        photos = self.search([('state', '=', 'pending'), ('attempted_at', '=', False)], limit=PHOTO_BATCH_SIZE)
+        for offset in range(0, len(photos), PHOTO_CHUNK_SIZE):
+            photos[offset:offset + PHOTO_CHUNK_SIZE]._process_photos()
+            if not getattr(threading.current_thread(), 'testing', False):
+                self.env.cr.commit()
+
+        expired = self.search([
+            ('state', '=', 'pending'),
+            ('create_date', '<', fields.Datetime.now() - MAX_PUNCH_AGE),
+        ])
+        expired.attachment_id.unlink()
+        expired.unlink()
+
+        if len(photos) == PHOTO_BATCH_SIZE:
+            self.env.ref('my_hr.ir_cron_attendance_photo')._trigger()
+
+    def _process_photos(self):
+        client_uids = self.mapped('client_uid')
+        attendances = self.env['hr.attendance'].search_fetch(
+            ['|', ('check_in_client_uid', 'in', client_uids), ('check_out_client_uid', 'in', client_uids)],
+            ['check_in_client_uid', 'check_out_client_uid', 'employee_id'],
+        )
+        attendance_by_uid = {att.check_in_client_uid: att for att in attendances}
+        check_out_uids = set(attendances.mapped('check_out_client_uid'))
+        now = fields.Datetime.now()
+
+        # Identical content is validated and thumbnailed once
+        thumbnails = {}
+        for photo in self:
+            attendance = attendance_by_uid.get(photo.client_uid)
+            if not attendance:
+                if photo.client_uid in check_out_uids:
+                    # Taken for a punch that turned out to be a check-out
+                    photo.attachment_id.unlink()
+                    photo.state = 'invalid'
+                else:
+                    photo.attempted_at = now
+                continue
+            if attendance.employee_id.id != photo.employee_id.id:
+                photo.state = 'invalid'
+                continue
+            if photo.checksum not in thumbnails:
+                try:
+                    thumbnails[photo.checksum] = base64.b64encode(
+                        image_process(photo.attachment_id.raw, size=THUMBNAIL_SIZE)
+                    )
+                except (UserError, ValueError, OSError):
+                    thumbnails[photo.checksum] = False
+            thumbnail = thumbnails[photo.checksum]
+            if not thumbnail:
+                _logger.warning('my_hr: invalid check-in photo %s discarded', photo.client_uid)
+                photo.attachment_id.unlink()
+                photo.state = 'invalid'
+                continue
+
+            # Hand the stored file over to the attendance's photo field
+            # instead of writing its content a second time
+            attendance.with_context(tracking_disable=True).write({
+                'check_in_photo_thumbnail': thumbnail,
+            })
+            photo.attachment_id.write({
+                'res_model': 'hr.attendance',
+                'res_field': 'check_in_photo',
+                'res_id': attendance.id,
+            })
+            attendance.invalidate_recordset(['check_in_photo'])
+            photo.write({'attendance_id': attendance.id, 'state': 'done'})
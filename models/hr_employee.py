@@ -1,7 +1,25 @@
 # -*- coding: utf-8 -*-
-from odoo import api, fields, models
+from collections import namedtuple
+from odoo import api, fields, models, tools
 from odoo.exceptions import ValidationError
 
+from .ormcache import MY_HR_CACHE, clear_my_hr_cache, ensure_my_hr_cache
+
+# What the controllers need to know about the current user's employee
+EmployeeRef = namedtuple('EmployeeRef', 'id name company_id office_ids')
+# Employee fields cached by the user -> employee resolver
+RESOLVER_FIELDS = {'user_id', 'active', 'allowed_office_ids', 'company_id', 'name'}
+
+# Employee fields feeding the payslip computation
+SALARY_FIELDS = {
+    'basic_salary',
+    'housing_type', 'housing_value', 'housing_rate',
+    'transport_type', 'transport_value', 'transport_rate',
+    'gosi_rate',
+    'exempt_from_deduction',
+    'resource_calendar_id',
+}
+
 
 class HrEmployee(models.Model):
     _inherit = 'hr.employee'
@@ -106,4 +124,81 @@ class HrEmployee(models.Model):
     def _check_gosi_rate(self):
         for emp in self:
             if emp.gosi_rate < 0 or emp.gosi_rate > 100:
-                raise ValidationError('GOSI rate must be between 0 and 100.')
\ No newline at end of file
+                raise ValidationError('GOSI rate must be between 0 and 100.')
+
+    def _my_hr_attendance_status(self):
+        """Check-in status shown by the systray button."""
+        self.ensure_one()
+        last = self.env['hr.attendance'].search_fetch(
+            [('employee_id', '=', self.id), ('check_out', '=', False)],
+            ['check_in'],
+            order='check_in desc',
+            limit=1
+        )
+        return {
+            'checked_in': bool(last),
+            'employee_name': self.name,
+            'check_in_time': last.check_in.strftime('%H:%M') if last else None,
+        }
+
+    def _my_hr_notify_attendance_status(self):
+        """Push the current check-in status to each employee's user over the bus."""
+        for employee in self.sudo().filtered('user_id'):
+            employee.user_id.partner_id._bus_send(
+                'my_hr.attendance_status', employee._my_hr_attendance_status()
+            )
+
+    @api.model
+    def _my_hr_current_employee_ref(self):
+        """EmployeeRef of the current user in the current company, or None."""
+        return self._my_hr_resolve_user(
+            self.env.uid, self.env.company.id, tuple(sorted(self.env.companies.ids))
+        )
+
+    @api.model
+    @tools.ormcache('uid', 'company_id', 'company_ids', cache=MY_HR_CACHE)
+    def _my_hr_resolve_user(self, uid, company_id, company_ids):
+        """
+        Resolve a user to its employee, preferring the current company, then
+        the other allowed companies. Cached per database in the my_hr cache,
+        cleared when an employee's user, company, name, active flag or
+        offices change.
+        """
+        Employee = self.sudo()
+        for company_domain in (
+            [('company_id', '=', company_id)],
+            [('company_id', 'in', list(company_ids))],
+            [('company_id', '=', False)],
+        ):
+            employee = Employee.search([('user_id', '=', uid)] + company_domain, limit=1)
+            if employee:
+                return EmployeeRef(
+                    employee.id,
+                    employee.name,
+                    employee.company_id.id,
+                    tuple(employee.allowed_office_ids.ids),
+                )
+        return None
+
+    def _register_hook(self):
+        super()._register_hook()
+        ensure_my_hr_cache(self.env.registry)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        employees = super().create(vals_list)
+        clear_my_hr_cache(self.env.registry)
+        return employees
+
+    def write(self, vals):
+        res = super().write(vals)
+        if SALARY_FIELDS & vals.keys():
+            self.env['my_hr.payslip']._mark_stale(dict.fromkeys(self.ids))
+        if RESOLVER_FIELDS & vals.keys():
+            clear_my_hr_cache(self.env.registry)
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        clear_my_hr_cache(self.env.registry)
+        return res
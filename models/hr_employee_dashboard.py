@@ -0,0 +1,321 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from odoo import api, models
+
+_logger = logging.getLogger(__name__)
+
+DASHBOARD_CACHE_TTL = 300  # seconds
+DASHBOARD_CACHE_SIZE = 4096
+# Longest date range served by the calendar endpoint
+MAX_CALENDAR_DAYS = 62
+# Models the dashboard payload is built from, flushed before the stamp query
+DASHBOARD_SOURCE_MODELS = [
+    'hr.employee', 'hr.leave', 'hr.leave.allocation', 'my_hr.payslip', 'my_hr.payroll.batch',
+]
+
+
+class DashboardCache:
+    """
+    Per-process LRU cache of dashboard payloads keyed by
+    (dbname, employee_id, month_start), with a time-to-live.
+    Values are (stamp, payload) pairs; callers only use a payload whose
+    stamp matches the current database stamp, so a write committed by any
+    worker process invalidates the entry in all of them. Evictions on
+    writes only free the memory early.
+    """
+
+    def __init__(self, ttl=DASHBOARD_CACHE_TTL, size=DASHBOARD_CACHE_SIZE):
+        self.ttl = ttl
+        self.size = size
+        self._entries = OrderedDict()
+        # (dbname, employee_id) -> keys of that employee, for cheap eviction
+        self._employee_keys = {}
+        self._lock = threading.RLock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                self._discard(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            self._employee_keys.setdefault(key[:2], set()).add(key)
+            while len(self._entries) > self.size:
+                self._discard(next(iter(self._entries)))
+
+    def evict(self, dbname, employee_ids=None):
+        """Drop the entries of the given employees, or of the whole database."""
+        with self._lock:
+            if employee_ids is None:
+                keys = [key for key in self._entries if key[0] == dbname]
+            else:
+                keys = [
+                    key
+                    for employee_id in employee_ids
+                    for key in self._employee_keys.get((dbname, employee_id), ())
+                ]
+            for key in keys:
+                self._discard(key)
+
+    def _discard(self, key):
+        self._entries.pop(key, None)
+        keys = self._employee_keys.get(key[:2])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._employee_keys[key[:2]]
+
+
+dashboard_cache = DashboardCache()
+
+
+class HrEmployee(models.Model):
+    _inherit = 'hr.employee'
+
+    @api.model
+    def _my_hr_invalidate_dashboard(self, employee_ids=None):
+        """
+        Evict the cached dashboards of ``employee_ids`` (all when None) in
+        this process. Other transactions and workers are covered by the
+        stamp of _get_my_hr_dashboard_stamp(); this covers the writing
+        transaction itself, whose rows all carry the same xmin.
+        """
+        dashboard_cache.evict(self.env.cr.dbname, set(employee_ids) if employee_ids is not None else None)
+
+    def _get_my_hr_dashboard_data(self):
+        """
+        Dashboard payload of this employee for the current month, cached
+        and revalidated against the database stamp of its data.
+        """
+        self.ensure_one()
+        month_start = date.today().replace(day=1)
+        key = (self.env.cr.dbname, self.id, month_start)
+        stamp = self._get_my_hr_dashboard_stamp(month_start)
+        entry = dashboard_cache.get(key)
+        if entry is not None and entry[0] == stamp:
+            return entry[1]
+        data = self._prepare_my_hr_dashboard_data(month_start)
+        dashboard_cache.set(key, (stamp, data))
+        return data
+
+    def _get_my_hr_dashboard_stamp(self, month_start):
+        """
+        Cheap fingerprint of the rows the dashboard payload is built from,
+        in one query: row count and sum of xmin (the id of the transaction
+        that last wrote each row) per source. Any committed insert, update
+        or delete changes it, whichever worker did it, unlike write_date,
+        which is the start of the writing transaction and can be older than
+        what was already seen.
+        """
+        self.ensure_one()
+        for model in DASHBOARD_SOURCE_MODELS:
+            self.env[model].flush_model()
+        self.env.cr.execute("""
+            SELECT concat_ws('|',
+                   (SELECT xmin::text FROM hr_employee WHERE id = %(employee_id)s),
+                   (SELECT concat_ws('-', count(*), sum(xmin::text::bigint))
+                      FROM my_hr_attendance_daily
+                     WHERE employee_id = %(employee_id)s AND date >= %(month_start)s),
+                   (SELECT concat_ws('-', count(*), sum(xmin::text::bigint))
+                      FROM hr_leave
+                     WHERE employee_id = %(employee_id)s AND date_from >= %(month_start)s),
+                   (SELECT concat_ws('-', count(*), sum(xmin::text::bigint))
+                      FROM hr_leave_allocation
+                     WHERE employee_id = %(employee_id)s),
+                   (SELECT concat_ws('-', count(*), sum(xmin::text::bigint))
+                      FROM my_hr_payslip
+                     WHERE employee_id = %(employee_id)s),
+                   (SELECT concat_ws('-', count(*), sum(xmin::text::bigint))
+                      FROM my_hr_payroll_batch))
+        """, {'employee_id': self.id, 'month_start': month_start})
+        return self.env.cr.fetchone()[0]
+
+    def _prepare_my_hr_dashboard_data(self, month_start):
+        """
+        Build the dashboard payload with a fixed number of queries: every
+        search fetches the fields it needs, and related records are fetched
+        once per recordset.
+        """
+        self.ensure_one()
+        today = date.today()
+        month_start_dt = datetime.combine(month_start, datetime.min.time())
+
+        # --- Employee Info ---
+        self.fetch(['name', 'barcode', 'job_title', 'department_id'])
+        department = self.department_id
+        department.fetch(['name', 'manager_id'])
+        department.manager_id.fetch(['name'])
+        employee_data = {
+            'id': self.id,
+            'name': self.name,
+            'badge_id': self.barcode or 'N/A',
+            'department': department.name or 'N/A',
+            'department_manager': department.manager_id.name or 'N/A',
+            'job_title': self.job_title or 'N/A',
+        }
+
+        # --- Leave Balance ---
+        leave_balance = 0.0
+        annual_leave = self.env['hr.leave.type'].search(
+            [('my_hr_accrual', '=', True)], limit=1
+        )
+        if annual_leave:
+            allocation = self.env['hr.leave.allocation'].search_fetch([
+                ('employee_id', '=', self.id),
+                ('holiday_status_id', '=', annual_leave.id),
+                ('state', '=', 'validate'),
+            ], ['number_of_days'], limit=1, order='id desc')
+            leave_balance = allocation.number_of_days or 0.0
+
+        # --- Next Pay Date ---
+        # Find latest published batch that includes this month
+        # (gracefully skip if user has no payroll access)
+        next_pay_date = 'N/A'
+        try:
+            next_batch = self.env['my_hr.payroll.batch'].search_fetch([
+                ('state', '=', 'published'),
+                ('date_to', '>=', today.strftime('%Y-%m-%d')),
+            ], ['date_to'], order='date_to asc', limit=1)
+            next_pay_date = next_batch.date_to.strftime('%d %b %Y') if next_batch else 'N/A'
+        except Exception as e:
+            _logger.debug('Could not fetch payroll batch (user may lack permissions): %s', str(e))
+
+        # --- Hours Worked This Month & Calendar Events ---
+        days = self.env['my_hr.attendance.daily'].search_fetch([
+            ('employee_id', '=', self.id),
+            ('date', '>=', month_start),
+        ], ['date', 'first_check_in', 'last_check_out', 'worked_hours'], order='date')
+        total_hours = round(sum(days.mapped('worked_hours')), 2)
+
+        calendar_events = [{
+            'type': 'attendance',
+            'date': day.date.strftime('%Y-%m-%d'),
+            'check_in': day.first_check_in.strftime('%H:%M'),
+            'check_out': day.last_check_out.strftime('%H:%M') if day.last_check_out else None,
+            'hours': round(day.worked_hours, 2),
+        } for day in days]
+
+        leaves_off = self.env['hr.leave'].search_fetch([
+            ('employee_id', '=', self.id),
+            ('state', '=', 'validate'),
+            ('date_from', '>=', month_start_dt),
+        ], ['date_from', 'holiday_status_id'])
+        leaves_off.holiday_status_id.fetch(['name'])
+        calendar_events += [{
+            'type': 'leave',
+            'date': leave.date_from.strftime('%Y-%m-%d'),
+            'label': leave.holiday_status_id.name or 'Time Off',
+        } for leave in leaves_off]
+
+        # --- Recent Payslips ---
+        # (gracefully skip if user has no payroll access)
+        payslip_list = []
+        try:
+            payslips = self.env['my_hr.payslip'].search_fetch([
+                ('employee_id', '=', self.id),
+                ('state', '=', 'confirmed'),
+            ], ['display_name', 'date_from', 'net_salary', 'currency_id'],
+                order='date_from desc', limit=12)
+            payslips.currency_id.fetch(['symbol'])
+            payslip_list = [{
+                'id': p.id,
+                'name': p.display_name,
+                'date': p.date_from.strftime('%B %Y'),
+                'net_salary': p.net_salary,
+                'currency': p.currency_id.symbol or '',
+            } for p in payslips]
+        except Exception as e:
+            _logger.debug('Could not fetch payslips (user may lack permissions): %s', str(e))
+
+        return {
+            'employee': employee_data,
+            'employee_name': self.name,
+            'leave_balance': leave_balance,
+            'next_pay_date': next_pay_date,
+            'total_hours': total_hours,
+            'calendar_events': calendar_events,
+            'payslips': payslip_list,
+        }
+
+    def _get_my_hr_calendar_etag(self, date_from, date_to):
+        """
+        Cheap fingerprint of the calendar data in the range: row count and
+        sum of xmin of the attendances and validated leaves it would return,
+        as in _get_my_hr_dashboard_stamp().
+        """
+        self.ensure_one()
+        self.env['my_hr.attendance.daily'].flush_model()
+        self.env['hr.leave'].flush_model()
+        start = datetime.combine(date_from, datetime.min.time())
+        end = datetime.combine(date_to + timedelta(days=1), datetime.min.time())
+        self.env.cr.execute("""
+            SELECT (SELECT concat_ws('-', count(*), sum(xmin::text::bigint))
+                      FROM my_hr_attendance_daily
+                     WHERE employee_id = %(employee_id)s
+                       AND date >= %(date_from)s AND date <= %(date_to)s),
+                   (SELECT concat_ws('-', count(*), sum(xmin::text::bigint))
+                      FROM hr_leave
+                     WHERE employee_id = %(employee_id)s
+                       AND state = 'validate'
+                       AND date_from >= %(start)s AND date_from < %(end)s)
+        """, {
+            'employee_id': self.id, 'start': start, 'end': end,
+            'date_from': date_from, 'date_to': date_to,
+        })
+        stamp = '|'.join(map(str, (self.id, date_from, date_to) + self.env.cr.fetchone()))
+        return hashlib.sha1(stamp.encode()).hexdigest()
+
+    def _get_my_hr_calendar_data(self, date_from, date_to):
+        """
+        Attendance days and validated leaves starting in the range, as
+        parallel columns: dates, types, hours, check_in, check_out and labels.
+        Attendance days come from the daily summary: first check-in, last
+        check-out and the hours worked that day.
+        """
+        self.ensure_one()
+        start = datetime.combine(date_from, datetime.min.time())
+        end = datetime.combine(date_to + timedelta(days=1), datetime.min.time())
+        columns = {key: [] for key in ('dates', 'types', 'hours', 'check_in', 'check_out', 'labels')}
+
+        days = self.env['my_hr.attendance.daily'].search_fetch([
+            ('employee_id', '=', self.id),
+            ('date', '>=', date_from),
+            ('date', '<=', date_to),
+        ], ['date', 'first_check_in', 'last_check_out', 'worked_hours'], order='date')
+        for day in days:
+            columns['dates'].append(day.date.strftime('%Y-%m-%d'))
+            columns['types'].append('attendance')
+            columns['hours'].append(round(day.worked_hours, 2))
+            columns['check_in'].append(day.first_check_in.strftime('%H:%M'))
+            columns['check_out'].append(day.last_check_out.strftime('%H:%M') if day.last_check_out else None)
+            columns['labels'].append(None)
+
+        leaves = self.env['hr.leave'].search_fetch([
+            ('employee_id', '=', self.id),
+            ('state', '=', 'validate'),
+            ('date_from', '>=', start),
+            ('date_from', '<', end),
+        ], ['date_from', 'holiday_status_id'], order='date_from')
+        leaves.holiday_status_id.fetch(['name'])
+        for leave in leaves:
+            columns['dates'].append(leave.date_from.strftime('%Y-%m-%d'))
+            columns['types'].append('leave')
+            columns['hours'].append(None)
+            columns['check_in'].append(None)
+            columns['check_out'].append(None)
+            columns['labels'].append(leave.holiday_status_id.name or 'Time Off')
+        return columns
@@ -1,6 +1,9 @@
 # -*- coding: utf-8 -*-
 import logging
+from collections import Counter, defaultdict
+from datetime import timedelta
 from odoo import api, fields, models
+from .perf_stat import profiled
 
 _logger = logging.getLogger(__name__)
 
@@ -20,11 +23,15 @@ class HrLeaveType(models.Model):
     )
 
     @api.model
+    @profiled('hr.leave.type.run_daily_accrual')
     def run_daily_accrual(self):
         """
         Daily cron entry point: called as model.run_daily_accrual()
         on hr.leave.type.
-        Adds 30/365 days to every active employee's validated annual allocation.
+        Adds 30/365 days to every active employee's validated annual allocation
+        for each day not yet recorded in the accrual ledger, so missed runs
+        are caught up and reruns accrue nothing. All matching allocations are
+        found in one search and updated with set-based statements.
         """
         accrual_amount = 30.0 / 365.0
 
@@ -37,25 +44,179 @@ class HrLeaveType(models.Model):
             _logger.info('my_hr accrual: no leave types with accrual enabled.')
             return
 
-        employees = self.env['hr.employee'].search([('active', '=', True)])
         today = fields.Date.today()
+        allocations = self._get_accrual_allocations(accrual_types, today)
+        accrued_days = self.env['my_hr.leave.accrual.line']._record_missing_days(
+            allocations, today, accrual_amount
+        )
 
-        for leave_type in accrual_types:
-            for emp in employees:
-                allocation = self.env['hr.leave.allocation'].search([
-                    ('employee_id', '=', emp.id),
-                    ('holiday_status_id', '=', leave_type.id),
-                    ('state', '=', 'validate'),
-                    ('date_from', '<=', today),
-                    '|',
-                    ('date_to', '=', False),
-                    ('date_to', '>=', today),
-                ], limit=1)
-
-                if allocation:
-                    new_days = (allocation.number_of_days or 0.0) + accrual_amount
-                    allocation.sudo().write({'number_of_days': new_days})
-                    _logger.debug(
-                        'Accrued %.4f day for %s on %s. New total: %.4f',
-                        accrual_amount, emp.name, leave_type.name, new_days
-                    )
\ No newline at end of file
+        # Allocations that missed the same number of days share one UPDATE
+        by_count = defaultdict(list)
+        for allocation_id, count in accrued_days.items():
+            by_count[count].append(allocation_id)
+        Allocation = self.env['hr.leave.allocation'].sudo()
+        for count, allocation_ids in by_count.items():
+            self._accrue_allocations(Allocation.browse(allocation_ids), count * accrual_amount)
+
+        _logger.info(
+            'my_hr accrual: %s allocation(s) eligible, %s accrued %s day-entr(ies) totalling %.4f day(s).',
+            len(allocations), len(accrued_days), sum(accrued_days.values()),
+            sum(accrued_days.values()) * accrual_amount
+        )
+
+    @api.model
+    def _get_accrual_allocations(self, accrual_types, day):
+        """
+        Validated allocations of active employees for the accrual types,
+        running on ``day``. Like the per-employee search this replaces,
+        only one allocation per employee and leave type is accrued.
+        """
+        allocations = self.env['hr.leave.allocation'].sudo().search_fetch([
+            ('employee_id.active', '=', True),
+            ('holiday_status_id', 'in', accrual_types.ids),
+            ('state', '=', 'validate'),
+            ('date_from', '<=', day),
+            '|',
+            ('date_to', '=', False),
+            ('date_to', '>=', day),
+        ], ['employee_id', 'holiday_status_id'])
+
+        seen = set()
+        allocation_ids = []
+        for allocation in allocations:
+            key = (allocation.employee_id.id, allocation.holiday_status_id.id)
+            if key not in seen:
+                seen.add(key)
+                allocation_ids.append(allocation.id)
+        return allocations.browse(allocation_ids)
+
+    @api.model
+    def _accrue_allocations(self, allocations, days):
+        """Add ``days`` to number_of_days of all allocations in one UPDATE."""
+        if not allocations:
+            return
+        allocations.flush_recordset(['number_of_days'])
+        self.env.cr.execute("""
+            UPDATE hr_leave_allocation
+               SET number_of_days = COALESCE(number_of_days, 0) + %s,
+                   write_uid = %s,
+                   write_date = (now() at time zone 'UTC')
+             WHERE id = ANY(%s)
+        """, (days, self.env.uid, allocations.ids))
+        # Keep the ORM cache and the fields computed from number_of_days consistent
+        allocations.invalidate_recordset(['number_of_days', 'write_uid', 'write_date'])
+        allocations.modified(['number_of_days'])
+        self.env['hr.employee']._my_hr_invalidate_dashboard()
+
+
+class HrLeaveAllocation(models.Model):
+    _inherit = 'hr.leave.allocation'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        allocations = super().create(vals_list)
+        self.env['hr.employee']._my_hr_invalidate_dashboard(allocations.employee_id.ids)
+        return allocations
+
+    def write(self, vals):
+        res = super().write(vals)
+        self.env['hr.employee']._my_hr_invalidate_dashboard(self.employee_id.ids)
+        return res
+
+    def unlink(self):
+        self.env['hr.employee']._my_hr_invalidate_dashboard(self.employee_id.ids)
+        return super().unlink()
+
+
+class HrLeave(models.Model):
+    _inherit = 'hr.leave'
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        leaves = super().create(vals_list)
+        self.env['hr.employee']._my_hr_invalidate_dashboard(leaves.employee_id.ids)
+        return leaves
+
+    def write(self, vals):
+        res = super().write(vals)
+        self.env['hr.employee']._my_hr_invalidate_dashboard(self.employee_id.ids)
+        return res
+
+    def unlink(self):
+        self.env['hr.employee']._my_hr_invalidate_dashboard(self.employee_id.ids)
+        return super().unlink()
+
+
+class MyHrLeaveAccrualLine(models.Model):
+    _name = 'my_hr.leave.accrual.line'
+    _description = 'Leave Accrual Ledger'
+    _order = 'date desc, id desc'
+
+    allocation_id = fields.Many2one(
+        'hr.leave.allocation',
+        string='Allocation',
+        required=True,
+        ondelete='cascade',
+        index=True
+    )
+    employee_id = fields.Many2one(
+        related='allocation_id.employee_id',
+        string='Employee'
+    )
+    date = fields.Date(string='Accrual Date', required=True)
+    days = fields.Float(string='Days Accrued', digits=(10, 4))
+
+    _allocation_date_uniq = models.Constraint(
+        'UNIQUE(allocation_id, date)',
+        'An allocation can only accrue once per day.',
+    )
+
+    @api.model
+    def _record_missing_days(self, allocations, today, days):
+        """
+        Insert a ledger line for every day each allocation has not accrued
+        yet, from the day after its last ledger line (or today for a new
+        allocation) up to today, however long the cron was down.
+        Already recorded days are skipped by the unique index, so reruns
+        are no-ops. Returns {allocation_id: number of days inserted}.
+        """
+        if not allocations:
+            return {}
+        last_dates = {
+            allocation.id: last_date
+            for allocation, last_date in self._read_group(
+                [('allocation_id', 'in', allocations.ids)],
+                groupby=['allocation_id'],
+                aggregates=['date:max'],
+            )
+        }
+        allocation_ids, start_dates = [], []
+        for allocation in allocations:
+            last_date = last_dates.get(allocation.id)
+            start = last_date + timedelta(days=1) if last_date else today
+            start = max(start, allocation.date_from or start)
+            if start <= today:
+                allocation_ids.append(allocation.id)
+                start_dates.append(start)
+        if not allocation_ids:
+            return {}
+
+        self.env.cr.execute("""
+            INSERT INTO my_hr_leave_accrual_line
+                   (allocation_id, date, days, create_uid, create_date, write_uid, write_date)
+            SELECT v.allocation_id, d::date, %(days)s,
+                   %(uid)s, (now() at time zone 'UTC'), %(uid)s, (now() at time zone 'UTC')
+              FROM unnest(%(allocation_ids)s::int[], %(start_dates)s::date[]) AS v(allocation_id, start_date)
+        CROSS JOIN LATERAL generate_series(v.start_date, %(today)s::date, interval '1 day') AS d
+                ON CONFLICT (allocation_id, date) DO NOTHING
+         RETURNING allocation_id
+        """, {
+            'days': days,
+            'uid': self.env.uid,
+            'allocation_ids': allocation_ids,
+            'start_dates': start_dates,
+            'today': today,
+        })
+        inserted = Counter(row[0] for row in self.env.cr.fetchall())
+        self.invalidate_model()
+        return dict(inserted)
@@ -1,8 +1,35 @@
 # -*- coding: utf-8 -*-
 import math
-from odoo import api, fields, models
+from collections import defaultdict
+from odoo import api, fields, models, tools
 from odoo.exceptions import ValidationError
 
+from .ormcache import MY_HR_CACHE, clear_my_hr_cache
+
+EARTH_RADIUS = 6371000  # Earth radius in meters
+METERS_PER_DEGREE = 111320.0
+# Grid cell size of the geofence index (~5.5 km of latitude)
+GRID_CELL_DEGREES = 0.05
+# Geofence fields cached by the grid index and the employee resolver
+INDEX_FIELDS = {'latitude', 'longitude', 'radius', 'active', 'company_id', 'employee_ids'}
+
+
+def haversine_distance(lat1, lon1, lat2, lon2):
+    """Great-circle distance in meters between two lat/lon points."""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dlat = math.radians(lat2 - lat1)
+    dlon = math.radians(lon2 - lon1)
+
+    a = (math.sin(dlat / 2) ** 2 +
+         math.cos(phi1) * math.cos(phi2) * math.sin(dlon / 2) ** 2)
+    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+    return EARTH_RADIUS * c
+
+
+def _grid_cell(lat, lon):
+    return math.floor(lat / GRID_CELL_DEGREES), math.floor(lon / GRID_CELL_DEGREES)
+
 
 class HrOfficeGeofence(models.Model):
     _name = 'hr.office.geofence'
@@ -32,17 +59,80 @@ class HrOfficeGeofence(models.Model):
             if rec.radius <= 0:
                 raise ValidationError('Radius must be greater than 0.')
 
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        clear_my_hr_cache(self.env.registry)
+        return records
+
+    def write(self, vals):
+        res = super().write(vals)
+        if INDEX_FIELDS & vals.keys():
+            clear_my_hr_cache(self.env.registry)
+        return res
+
+    def unlink(self):
+        res = super().unlink()
+        clear_my_hr_cache(self.env.registry)
+        return res
+
     def check_point_in_radius(self, lat, lon):
         """Use Haversine formula to check if lat/lon is within this geofence radius."""
         self.ensure_one()
-        R = 6371000  # Earth radius in meters
-        lat1 = math.radians(self.latitude)
-        lat2 = math.radians(lat)
-        dlat = math.radians(lat - self.latitude)
-        dlon = math.radians(lon - self.longitude)
-
-        a = (math.sin(dlat / 2) ** 2 +
-             math.cos(lat1) * math.cos(lat2) * math.sin(dlon / 2) ** 2)
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-        distance = R * c
-        return distance <= self.radius
\ No newline at end of file
+        return haversine_distance(self.latitude, self.longitude, lat, lon) <= self.radius
+
+    @tools.ormcache('company_id', cache=MY_HR_CACHE)
+    def _get_geofence_index(self, company_id):
+        """
+        Grid index of the company's active geofences.
+        Returns (grid, office_ids) where grid maps a cell to the tuple of
+        (office_id, lat, lon, radius, min_lat, max_lat, min_lon, max_lon)
+        entries whose bounding box overlaps that cell.
+        """
+        offices = self.sudo().search_fetch(
+            [('company_id', '=', company_id)], ['latitude', 'longitude', 'radius']
+        )
+        grid = defaultdict(list)
+        for office in offices:
+            lat, lon, radius = office.latitude, office.longitude, office.radius
+            dlat = radius / METERS_PER_DEGREE
+            dlon = radius / (METERS_PER_DEGREE * max(math.cos(math.radians(lat)), 0.01))
+            entry = (office.id, lat, lon, radius, lat - dlat, lat + dlat, lon - dlon, lon + dlon)
+            min_cell = _grid_cell(lat - dlat, lon - dlon)
+            max_cell = _grid_cell(lat + dlat, lon + dlon)
+            for i in range(min_cell[0], max_cell[0] + 1):
+                for j in range(min_cell[1], max_cell[1] + 1):
+                    grid[(i, j)].append(entry)
+        return (
+            {cell: tuple(entries) for cell, entries in grid.items()},
+            frozenset(offices.ids),
+        )
+
+    @api.model
+    def _find_nearest_geofence(self, lat, lon, office_ids=None, company_id=None):
+        """
+        Return (office_id, distance) of the nearest geofence containing the
+        point, restricted to ``office_ids`` when given, or (False, None).
+        Only the offices bucketed in the point's grid cell that pass a
+        bounding-box test get an exact distance computation.
+        """
+        grid, indexed_ids = self._get_geofence_index(company_id or self.env.company.id)
+        allowed = set(office_ids) if office_ids is not None else None
+
+        best_id, best_distance = False, None
+        for office_id, olat, olon, radius, min_lat, max_lat, min_lon, max_lon in grid.get(_grid_cell(lat, lon), ()):
+            if allowed is not None and office_id not in allowed:
+                continue
+            if not (min_lat <= lat <= max_lat and min_lon <= lon <= max_lon):
+                continue
+            distance = haversine_distance(olat, olon, lat, lon)
+            if distance <= radius and (best_distance is None or distance < best_distance):
+                best_id, best_distance = office_id, distance
+
+        # Allowed offices of another company are not in this index
+        if not best_id and allowed:
+            for office in self.browse(allowed - indexed_ids).exists().filtered('active'):
+                distance = haversine_distance(office.latitude, office.longitude, lat, lon)
+                if distance <= office.radius and (best_distance is None or distance < best_distance):
+                    best_id, best_distance = office.id, distance
+        return best_id, best_distance
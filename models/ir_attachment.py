@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import os
+import shutil
+import tempfile
+from odoo import api, models
+
+READ_CHUNK_SIZE = 64 * 1024
+
+
+class IrAttachment(models.Model):
+    _inherit = 'ir.attachment'
+
+    @api.model
+    def _my_hr_create_from_file(self, fileobj, vals):
+        """
+        Create an attachment from a binary file object, copying it into the
+        filestore chunk by chunk instead of loading it whole into memory.
+        Falls back to a regular create when attachments live in the database.
+        """
+        fileobj.seek(0)
+        if self._storage() != 'file':
+            return self.create(dict(vals, raw=fileobj.read()))
+
+        sha = hashlib.sha1()
+        file_size = 0
+        for chunk in iter(lambda: fileobj.read(READ_CHUNK_SIZE), b''):
+            sha.update(chunk)
+            file_size += len(chunk)
+        checksum = sha.hexdigest()
+
+        # Content-addressed like _file_write: identical content shares a file.
+        # Not through _get_path(), whose collision check compares the file
+        # with in-memory content and would reject every existing file here.
+        fname = checksum[:2] + '/' + checksum
+        full_path = self._full_path(fname)
+        if not os.path.isfile(full_path):
+            os.makedirs(os.path.dirname(full_path), exist_ok=True)
+            fileobj.seek(0)
+            with tempfile.NamedTemporaryFile(dir=os.path.dirname(full_path), delete=False) as tmp:
+                shutil.copyfileobj(fileobj, tmp, READ_CHUNK_SIZE)
+            os.replace(tmp.name, full_path)
+
+        attachment = self.create(vals)
+        # create() drops store_fname/checksum/file_size from vals, set them directly
+        self.env.cr.execute(
+            'UPDATE ir_attachment SET store_fname = %s, checksum = %s, file_size = %s WHERE id = %s',
+            (fname, checksum, file_size, attachment.id),
+        )
+        attachment.invalidate_recordset(['store_fname', 'checksum', 'file_size', 'raw', 'datas'])
+        return attachment
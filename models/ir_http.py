@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+from odoo import models
+
+
+class IrHttp(models.AbstractModel):
+    _inherit = 'ir.http'
+
+    def session_info(self):
+        """Ship the check-in status with the session so the systray renders without a request."""
+        info = super().session_info()
+        Employee = self.env['hr.employee']
+        employee_ref = Employee._my_hr_current_employee_ref()
+        if employee_ref:
+            info['my_hr_attendance_status'] = Employee.browse(employee_ref.id)._my_hr_attendance_status()
+        return info
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+"""
+Dedicated ormcache of my_hr, so that my_hr records invalidate their own
+lookups with registry.clear_cache(MY_HR_CACHE) instead of clearing the
+'default' cache of the whole registry (and of every worker) on each write.
+"""
+from odoo.modules import registry as odoo_registry
+from odoo.tools.lru import LRU
+
+MY_HR_CACHE = 'my_hr'
+MY_HR_CACHE_SIZE = 1024
+
+# Known to every registry created from now on, and signaled between workers
+odoo_registry._REGISTRY_CACHES.setdefault(MY_HR_CACHE, MY_HR_CACHE_SIZE)
+odoo_registry._CACHES_BY_KEY.setdefault(MY_HR_CACHE, (MY_HR_CACHE,))
+
+
+def ensure_my_hr_cache(registry):
+    """Add the cache to a registry created before this module was imported."""
+    registry._Registry__caches.setdefault(MY_HR_CACHE, LRU(MY_HR_CACHE_SIZE))
+
+
+def clear_my_hr_cache(registry):
+    """Clear the cache, also while the module is being installed."""
+    ensure_my_hr_cache(registry)
+    registry.clear_cache(MY_HR_CACHE)
@@ -1,9 +1,19 @@
 # -*- coding: utf-8 -*-
 import io
-import base64
+import logging
+import tempfile
+import threading
 from datetime import date
 from odoo import api, fields, models
 from odoo.exceptions import UserError, ValidationError
+from .perf_stat import profiled
+from .wps_formats import get_wps_format, wps_format_selection
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 500
+# Payslips loaded per prefetch while streaming the WPS file
+WPS_FETCH_SIZE = 1000
 
 
 class MyHrPayrollBatch(models.Model):
@@ -42,15 +52,92 @@ class MyHrPayrollBatch(models.Model):
         compute='_compute_payslip_count',
         string='Payslips'
     )
+    stale_payslip_count = fields.Integer(
+        compute='_compute_stale_payslip_count',
+        string='Stale Payslips'
+    )
     notes = fields.Text(string='Notes')
-    wps_file = fields.Binary(string='WPS File', readonly=True, copy=False)
+    wps_attachment_id = fields.Many2one(
+        'ir.attachment',
+        string='WPS File',
+        readonly=True,
+        copy=False
+    )
     wps_filename = fields.Char(string='WPS Filename', readonly=True, copy=False)
+    wps_format = fields.Selection(
+        selection=lambda self: wps_format_selection(),
+        string='WPS File Format',
+        default='hrsd',
+        required=True
+    )
+
+    # Variance against the previous published batch
+    variance_line_ids = fields.One2many(
+        'my_hr.payroll.variance', 'batch_id',
+        string='Variances',
+        readonly=True,
+        groups='my_hr.group_my_hr_payroll'
+    )
+    variance_previous_batch_id = fields.Many2one(
+        'my_hr.payroll.batch',
+        string='Compared With',
+        readonly=True,
+        copy=False
+    )
+    variance_date = fields.Datetime(string='Variances Computed On', readonly=True, copy=False)
+
+    # Background generation progress
+    generation_state = fields.Selection([
+        ('idle', 'Idle'),
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ], string='Generation Status', default='idle', readonly=True, copy=False)
+    generation_error = fields.Char(string='Generation Error', readonly=True, copy=False)
+    generation_total = fields.Integer(string='Employees to Process', readonly=True, copy=False)
+    generation_processed = fields.Integer(string='Employees Processed', readonly=True, copy=False)
+    generation_last_employee_id = fields.Integer(
+        string='Last Processed Employee ID',
+        readonly=True,
+        copy=False,
+        help='Generation resumes after this employee if the job is interrupted.'
+    )
+    generation_progress = fields.Float(
+        string='Generation Progress',
+        compute='_compute_generation_progress'
+    )
 
     @api.depends('payslip_ids')
     def _compute_payslip_count(self):
         for batch in self:
             batch.payslip_count = len(batch.payslip_ids)
 
+    def _compute_stale_payslip_count(self):
+        groups = self.env['my_hr.payslip']._read_group(
+            [('batch_id', 'in', self.ids), ('state', '=', 'draft'), ('is_stale', '=', True)],
+            groupby=['batch_id'],
+            aggregates=['__count'],
+        )
+        counts = {batch.id: count for batch, count in groups}
+        for batch in self:
+            batch.stale_payslip_count = counts.get(batch.id, 0)
+
+    @api.depends('generation_processed', 'generation_total')
+    def _compute_generation_progress(self):
+        for batch in self:
+            if batch.generation_total:
+                batch.generation_progress = 100.0 * batch.generation_processed / batch.generation_total
+            else:
+                batch.generation_progress = 0.0
+
+    def write(self, vals):
+        res = super().write(vals)
+        if 'state' in vals or 'date_to' in vals:
+            # The next pay date on every dashboard depends on published batches
+            self.env['hr.employee']._my_hr_invalidate_dashboard()
+        return res
+
     @api.constrains('date_from', 'date_to')
     def _check_dates(self):
         for batch in self:
@@ -59,10 +146,20 @@ class MyHrPayrollBatch(models.Model):
 
     # ---- State transitions ----
 
+    def _check_generation_idle(self):
+        if self.filtered(lambda b: b.generation_state in ('queued', 'running')):
+            raise UserError(
+                'Payslips are being generated in the background. '
+                'Wait for the generation to finish first.'
+            )
+
     def action_submit_manager(self):
         self.ensure_one()
         if self.state != 'draft':
             raise UserError('Only Draft batches can be submitted.')
+        self._check_generation_idle()
+        if self.generation_state == 'failed':
+            raise UserError('The background generation failed. Resume or restart it before submitting.')
         if not self.payslip_ids:
             raise UserError('Please generate payslips before submitting.')
         self.state = 'manager_approve'
@@ -71,6 +168,9 @@ class MyHrPayrollBatch(models.Model):
         self.ensure_one()
         if self.state != 'manager_approve':
             raise UserError('Batch is not pending manager approval.')
+        # Ready for the CEO review; the variances are recorded for the payroll
+        # managers whoever approves, they are not shown to the approver
+        self.sudo()._compute_variances()
         self.state = 'ceo_approve'
 
     def action_ceo_approve(self):
@@ -79,43 +179,116 @@ class MyHrPayrollBatch(models.Model):
             raise UserError('Batch is not pending CEO approval.')
         self.state = 'published'
 
+    def action_confirm_all_payslips(self):
+        """Confirm every draft payslip of the selected batches."""
+        self._check_generation_idle()
+        if self.filtered(lambda batch: batch.state in ('published', 'cancelled')):
+            raise UserError('Payslips of Published or Cancelled batches cannot be confirmed.')
+        slips = self.env['my_hr.payslip'].search([('batch_id', 'in', self.ids), ('state', '=', 'draft')])
+        if slips.filtered('is_stale'):
+            raise UserError('Some payslips need to be recomputed first. Use "Recompute Stale".')
+        slips.action_confirm()
+
+    def action_cancel_all_payslips(self):
+        """Cancel every payslip of the selected batches that is not cancelled yet."""
+        self._check_generation_idle()
+        if self.filtered(lambda batch: batch.state == 'published'):
+            raise UserError('Payslips of Published batches cannot be cancelled.')
+        self.env['my_hr.payslip'].search([
+            ('batch_id', 'in', self.ids), ('state', '!=', 'cancelled'),
+        ]).action_cancel()
+
+    def action_compute_variances(self):
+        self.ensure_one()
+        self._compute_variances()
+
+    def _get_previous_published_batch(self):
+        self.ensure_one()
+        return self.search([
+            ('company_id', '=', self.company_id.id),
+            ('state', '=', 'published'),
+            ('date_to', '<', self.date_from),
+            ('id', '!=', self.id),
+        ], order='date_to desc', limit=1)
+
+    def _compute_variances(self):
+        """
+        Compare this batch with the previous published batch of the company:
+        both are read in one aggregated query each, keyed by employee, and
+        the flagged differences replace the variance lines of the batch.
+        """
+        self.ensure_one()
+        Variance = self.env['my_hr.payroll.variance']
+        previous_batch = self._get_previous_published_batch()
+        previous = Variance._read_batch_totals(previous_batch) if previous_batch else {}
+        current = Variance._read_batch_totals(self)
+        # Without a previous batch every employee would be flagged as new
+        vals_list = Variance._prepare_variance_vals(self, previous, current) if previous_batch else []
+        self.variance_line_ids.unlink()
+        Variance.create(vals_list)
+        self.write({
+            'variance_previous_batch_id': previous_batch.id,
+            'variance_date': fields.Datetime.now(),
+        })
+
+    def action_open_analysis(self):
+        self.ensure_one()
+        action = self.env['ir.actions.act_window']._for_xml_id('my_hr.action_my_hr_payroll_report')
+        action['domain'] = [('batch_id', '=', self.id)]
+        action['display_name'] = f'Payroll Analysis: {self.name}'
+        return action
+
     def action_cancel(self):
         if self.state == 'published':
             raise UserError('Published batches cannot be cancelled.')
+        self._check_generation_idle()
         self.state = 'cancelled'
 
     def action_reset_draft(self):
         if self.state == 'published':
             raise UserError('Published batches cannot be reset to draft.')
+        self._check_generation_idle()
         self.state = 'draft'
 
     # ---- Payslip generation ----
 
+    def _get_payroll_employee_domain(self):
+        self.ensure_one()
+        return [
+            ('active', '=', True),
+            ('company_id', '=', self.company_id.id),
+        ]
+
+    def _prepare_payslip_vals(self, employees):
+        self.ensure_one()
+        return [{
+            'batch_id': self.id,
+            'employee_id': emp.id,
+            'date_from': self.date_from,
+            'date_to': self.date_to,
+            'state': 'draft',
+        } for emp in employees]
+
+    @profiled('my_hr.payroll.batch.action_generate_payslips')
     def action_generate_payslips(self):
         self.ensure_one()
         if self.state != 'draft':
             raise UserError('Payslips can only be generated in Draft state.')
+        if self.generation_state in ('queued', 'running'):
+            raise UserError('Payslips are already being generated in the background.')
 
-        employees = self.env['hr.employee'].search([
-            ('active', '=', True),
-            ('company_id', '=', self.company_id.id),
-        ])
+        employees = self.env['hr.employee'].search(self._get_payroll_employee_domain())
+        if self.generation_state == 'failed':
+            # Replaces the partial result of the failed background run
+            self.write({'generation_state': 'idle', 'generation_error': False})
 
         # Remove existing draft payslips
         self.payslip_ids.filtered(lambda p: p.state == 'draft').unlink()
 
-        payslips = []
-        for emp in employees:
-            payslips.append({
-                'batch_id': self.id,
-                'employee_id': emp.id,
-                'date_from': self.date_from,
-                'date_to': self.date_to,
-                'state': 'draft',
-            })
+        payslips = self._prepare_payslip_vals(employees)
         if payslips:
             created = self.env['my_hr.payslip'].create(payslips)
-            created.action_compute()
+            created._compute_payslips()
 
         return {
             'type': 'ir.actions.client',
@@ -127,87 +300,289 @@ class MyHrPayrollBatch(models.Model):
             }
         }
 
+    def action_compute_payslips(self):
+        """
+        Recompute the draft payslips of all selected batches in one run.
+        Month-end closes select one batch per company; the engine computes
+        the combined slips and writes them back at once.
+        """
+        batches = self.filtered(lambda b: b.state == 'draft')
+        if not batches:
+            raise UserError('Payslips can only be computed on Draft batches.')
+        slips = batches.payslip_ids.filtered(lambda p: p.state == 'draft')
+        slips._compute_payslips()
+
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': 'Payslips Computed',
+                'message': f'{len(slips)} payslip(s) computed across {len(batches)} batch(es).',
+                'type': 'success',
+            }
+        }
+
+    def action_recompute_stale(self):
+        """Recompute only the draft payslips flagged as stale."""
+        self.ensure_one()
+        self._check_generation_idle()
+        if self.state != 'draft':
+            raise UserError('Payslips can only be computed on Draft batches.')
+        stale = self.env['my_hr.payslip'].search([
+            ('batch_id', '=', self.id),
+            ('state', '=', 'draft'),
+            ('is_stale', '=', True),
+        ])
+        stale._compute_payslips()
+
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': 'Stale Payslips Recomputed',
+                'message': f'{len(stale)} payslip(s) recomputed.',
+                'type': 'success',
+            }
+        }
+
+    def action_generate_payslips_background(self):
+        """Queue payslip generation for the background cron job."""
+        self.ensure_one()
+        if self.state != 'draft':
+            raise UserError('Payslips can only be generated in Draft state.')
+        if self.generation_state in ('queued', 'running'):
+            raise UserError('Payslips are already being generated in the background.')
+
+        self.write({
+            'generation_state': 'queued',
+            'generation_error': False,
+            'generation_total': self.env['hr.employee'].search_count(
+                self._get_payroll_employee_domain()
+            ),
+            'generation_processed': 0,
+            'generation_last_employee_id': 0,
+        })
+        self.env.ref('my_hr.ir_cron_payroll_generation')._trigger()
+
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': 'Payslip Generation Queued',
+                'message': f'{self.generation_total} payslip(s) will be generated in the background.',
+                'type': 'info',
+            }
+        }
+
+    def action_resume_generation(self):
+        """Resume a failed background generation after the last committed chunk."""
+        self.ensure_one()
+        if self.generation_state != 'failed':
+            raise UserError('Only a failed generation can be resumed.')
+        if self.state != 'draft':
+            raise UserError('Payslips can only be generated in Draft state.')
+        self.write({'generation_state': 'running', 'generation_error': False})
+        self.env.ref('my_hr.ir_cron_payroll_generation')._trigger()
+
+    def action_reset_generation(self):
+        """Give up a failed background generation, keeping the payslips generated so far."""
+        self.ensure_one()
+        if self.generation_state != 'failed':
+            raise UserError('Only a failed generation can be reset.')
+        self.write({'generation_state': 'idle', 'generation_error': False})
+
+    @api.model
+    def _cron_generate_payslips(self):
+        """
+        Cron entry point: process queued and interrupted generation runs.
+        A run whose chunk raises is marked failed, so it is not retried
+        forever and the batch can be resumed or reset from its form.
+        """
+        for batch in self.search([('generation_state', 'in', ('queued', 'running'))]):
+            try:
+                batch._run_payslip_generation()
+            except Exception as e:
+                self.env.cr.rollback()
+                self.env.transaction.reset()
+                _logger.exception('my_hr payroll: background generation of batch %s failed', batch.id)
+                batch.write({'generation_state': 'failed', 'generation_error': str(e)[:255]})
+                batch._commit_generation_progress()
+
+    def _run_payslip_generation(self):
+        """
+        Generate payslips chunk by chunk, committing after each chunk.
+        Progress is stored on the batch so a killed run resumes after the
+        last committed employee instead of starting over.
+        """
+        self.ensure_one()
+        chunk_size = int(self.env['ir.config_parameter'].sudo().get_param(
+            'my_hr.payroll_chunk_size', DEFAULT_CHUNK_SIZE
+        )) or DEFAULT_CHUNK_SIZE
+
+        if self.state != 'draft':
+            self._stop_payslip_generation()
+            return
+
+        if self.generation_state == 'queued':
+            self.payslip_ids.filtered(lambda p: p.state == 'draft').unlink()
+            self.generation_state = 'running'
+            self._commit_generation_progress()
+
+        Employee = self.env['hr.employee']
+        domain = self._get_payroll_employee_domain()
+        while True:
+            employees = Employee.search(
+                domain + [('id', '>', self.generation_last_employee_id)],
+                order='id', limit=chunk_size,
+            )
+            if not employees:
+                break
+            created = self.env['my_hr.payslip'].create(self._prepare_payslip_vals(employees))
+            created._compute_payslips()
+            self.write({
+                'generation_processed': self.generation_processed + len(employees),
+                'generation_last_employee_id': employees[-1].id,
+            })
+            self._commit_generation_progress()
+            _logger.info(
+                'my_hr payroll: batch %s generated %s/%s payslips',
+                self.id, self.generation_processed, self.generation_total
+            )
+            # The batch may have left draft in another transaction meanwhile
+            self.invalidate_recordset(['state'])
+            if self.state != 'draft':
+                self._stop_payslip_generation()
+                return
+
+        self.generation_state = 'done'
+        self._commit_generation_progress()
+
+    def _stop_payslip_generation(self):
+        _logger.info('my_hr payroll: batch %s left draft, background generation stopped', self.id)
+        self.generation_state = 'idle'
+        self._commit_generation_progress()
+
+    def _commit_generation_progress(self):
+        if not getattr(threading.current_thread(), 'testing', False):
+            self.env.cr.commit()
+
     # ---- WPS Export ----
 
     def action_export_wps(self):
         self.ensure_one()
         if self.state != 'published':
             raise UserError('Only Published batches can be exported to WPS.')
-        wps_content = self._generate_wps_file()
-        filename = f"WPS_{self.name.replace(' ', '_')}_{self.date_to}.txt"
+        wps_format = get_wps_format(self.wps_format)
+        filename = f"WPS_{self.name.replace(' ', '_')}_{self.date_to}.{wps_format.extension}"
+        old_attachment = self.wps_attachment_id
         self.write({
-            'wps_file': base64.b64encode(wps_content.encode('utf-8')),
+            'wps_attachment_id': self._generate_wps_file(filename).id,
             'wps_filename': filename,
         })
+        old_attachment.unlink()
+        return self.action_download_wps()
+
+    def action_download_wps(self):
+        self.ensure_one()
         return {
             'type': 'ir.actions.act_url',
-            'url': f'/web/content/my_hr.payroll.batch/{self.id}/wps_file/{filename}?download=true',
+            'url': f'/my_hr/payroll/wps/{self.id}',
             'target': 'self',
         }
 
-    def _generate_wps_file(self):
+    @profiled('my_hr.payroll.batch._generate_wps_file')
+    def _generate_wps_file(self, filename):
         """
-        Generate a fixed-width WPS text file complying with HRSD standards.
-        Record Types:
-          H - Header
-          D - Detail (employee)
-          T - Trailer/Footer
+        Stream the WPS records into a temporary file, check it parses back
+        consistently, and store it as an attachment of the batch, so memory
+        stays flat whatever the size.
+        """
+        self.ensure_one()
+        wps_format = get_wps_format(self.wps_format)
+        line_end = wps_format.line_end.encode('utf-8')
+        with tempfile.TemporaryFile() as tmp:
+            separator = b''
+            for line in self._iter_wps_lines(wps_format):
+                tmp.write(separator + line.encode('utf-8'))
+                separator = line_end
+
+            tmp.seek(0)
+            try:
+                wps_format.validate(
+                    raw.decode('utf-8').rstrip('\r\n') for raw in tmp
+                )
+            except ValueError as e:
+                raise UserError(f'The generated WPS file is invalid: {e}')
+
+            return self.env['ir.attachment']._my_hr_create_from_file(tmp, {
+                'name': filename,
+                'res_model': self._name,
+                'res_id': self.id,
+                'mimetype': 'text/csv' if wps_format.separator else 'text/plain',
+            })
+
+    def _iter_wps_lines(self, wps_format):
+        """
+        Yield the lines of the WPS file in the given format: an optional
+        header, the detail records of confirmed payslips rendered a chunk
+        at a time, and the trailer with count and total.
         """
         self.ensure_one()
-        lines = []
         total_salary = 0.0
         detail_count = 0
 
-        # --- Header Record ---
-        # Format: H | Employer ID | File Date | Currency | Reserved
-        employer_id = (self.company_id.vat or '0000000000').replace(' ', '').ljust(10)[:10]
-        file_date = fields.Date.today().strftime('%Y%m%d')
-        currency_code = (self.company_id.currency_id.name or 'SAR').ljust(3)[:3]
-        header = (
-            f"H"
-            f"{employer_id}"
-            f"{file_date}"
-            f"{currency_code}"
-            f"{'':52}"   # Reserved padding
-        )
-        lines.append(header)
-
-        # --- Detail Records ---
-        for slip in self.payslip_ids.filtered(lambda p: p.state == 'confirmed'):
-            emp = slip.employee_id
-            # Sanitize IBAN: remove spaces, ensure 24 chars (SA IBANs are 24)
-            raw_iban = ''
-            if emp.bank_account_id and emp.bank_account_id.acc_number:
-                raw_iban = emp.bank_account_id.acc_number.replace(' ', '').upper()
-            iban = raw_iban[:24].ljust(24)
-
-            emp_id = (emp.id_number or str(emp.id)).replace(' ', '').ljust(15)[:15]
-            salary_str = f"{slip.net_salary:015.2f}".replace('.', '').zfill(15)[:15]
-            name = (emp.name or '').ljust(40)[:40]
-            salary_month = self.date_to.strftime('%Y%m')
-
-            detail = (
-                f"D"
-                f"{emp_id}"
-                f"{iban}"
-                f"{salary_str}"
-                f"{name}"
-                f"{salary_month}"
-                f"{'':5}"  # Reserved
-            )
-            lines.append(detail)
-            total_salary += slip.net_salary
-            detail_count += 1
-
-        # --- Footer / Trailer Record ---
-        total_str = f"{total_salary:015.2f}".replace('.', '').zfill(15)[:15]
-        count_str = str(detail_count).zfill(6)[:6]
-        footer = (
-            f"T"
-            f"{count_str}"
-            f"{total_str}"
-            f"{'':45}"  # Reserved padding
-        )
-        lines.append(footer)
+        salary_month = self.date_to.strftime('%Y%m')
+        file_values = {
+            'employer_id': (self.company_id.vat or '0000000000').replace(' ', ''),
+            'file_date': fields.Date.today().strftime('%Y%m%d'),
+            'currency': self.company_id.currency_id.name or 'SAR',
+            'salary_month': salary_month,
+        }
+
+        header = wps_format.render_header(file_values)
+        if header is not None:
+            yield header
+
+        Payslip = self.env['my_hr.payslip']
+        slip_ids = Payslip.search(
+            [('batch_id', '=', self.id), ('state', '=', 'confirmed')], order='id'
+        ).ids
+        for i in range(0, len(slip_ids), WPS_FETCH_SIZE):
+            # Prefetch slips, employees and bank accounts for the whole chunk
+            slips = Payslip.browse(slip_ids[i:i + WPS_FETCH_SIZE])
+            slips.fetch(['employee_id', 'net_salary'])
+            employees = slips.employee_id
+            employees.fetch(['name', 'id_number', 'bank_account_id'])
+            employees.bank_account_id.fetch(['acc_number'])
+
+            count = len(slips)
+            amounts = slips.mapped('net_salary')
+            columns = {
+                # Sanitize IBAN: remove spaces, uppercase
+                'iban': [
+                    (slip.employee_id.bank_account_id.acc_number or '').replace(' ', '').upper()
+                    for slip in slips
+                ],
+                'employee_code': [
+                    (slip.employee_id.id_number or str(slip.employee_id.id)).replace(' ', '')
+                    for slip in slips
+                ],
+                'name': [slip.employee_id.name or '' for slip in slips],
+                'amount': amounts,
+                'salary_month': [salary_month] * count,
+                'period_start': [str(self.date_from)] * count,
+                'period_end': [str(self.date_to)] * count,
+            }
+            yield from wps_format.render_details(columns, count)
+            total_salary += sum(amounts)
+            detail_count += count
+
+            # Release the chunk from the cache before loading the next one
+            slips.invalidate_recordset()
+            employees.invalidate_recordset()
 
-        return '\r\n'.join(lines)
\ No newline at end of file
+        trailer = wps_format.render_trailer(dict(
+            file_values, count=detail_count, total=total_salary
+        ))
+        if trailer is not None:
+            yield trailer
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+from odoo import fields, models, tools
+
+# (sequence, component, type, signed payslip column): one report row per
+# payslip and component, deductions negative so that sums give net pay
+SALARY_COMPONENTS = [
+    (1, 'basic', 'earning', 'p.basic_salary'),
+    (2, 'housing', 'allowance', 'p.housing_allowance'),
+    (3, 'transport', 'allowance', 'p.transport_allowance'),
+    (4, 'gosi', 'deduction', '-p.gosi_deduction'),
+    (5, 'attendance', 'deduction', '-p.attendance_deduction'),
+]
+
+
+class PayrollReport(models.Model):
+    _name = 'my_hr.payroll.report'
+    _description = 'Payroll Analysis'
+    _auto = False
+    _order = 'batch_id desc, employee_id, sequence'
+    _rec_name = 'payslip_id'
+
+    batch_id = fields.Many2one('my_hr.payroll.batch', string='Payroll Batch', readonly=True)
+    payslip_id = fields.Many2one('my_hr.payslip', string='Payslip', readonly=True)
+    employee_id = fields.Many2one('hr.employee', string='Employee', readonly=True)
+    department_id = fields.Many2one('hr.department', string='Department', readonly=True)
+    company_id = fields.Many2one('res.company', string='Company', readonly=True)
+    currency_id = fields.Many2one('res.currency', string='Currency', readonly=True)
+    date_from = fields.Date(string='Period Start', readonly=True)
+    batch_state = fields.Selection(
+        lambda self: self.env['my_hr.payroll.batch']._fields['state'].selection,
+        string='Batch Status', readonly=True
+    )
+    payslip_state = fields.Selection(
+        lambda self: self.env['my_hr.payslip']._fields['state'].selection,
+        string='Payslip Status', readonly=True
+    )
+    sequence = fields.Integer(string='Sequence', readonly=True)
+    component = fields.Selection([
+        ('basic', 'Basic Salary'),
+        ('housing', 'Housing Allowance'),
+        ('transport', 'Transport Allowance'),
+        ('gosi', 'GOSI Deduction'),
+        ('attendance', 'Attendance Deduction'),
+    ], string='Component', readonly=True)
+    component_type = fields.Selection([
+        ('earning', 'Earning'),
+        ('allowance', 'Allowance'),
+        ('deduction', 'Deduction'),
+    ], string='Component Type', readonly=True)
+    amount = fields.Monetary(string='Amount', currency_field='currency_id', readonly=True)
+    payslip_count = fields.Integer(
+        string='Payslips', readonly=True,
+        help='1 on one row of each payslip, so that sums count payslips.'
+    )
+
+    def init(self):
+        tools.drop_view_if_exists(self.env.cr, self._table)
+        components = ', '.join(
+            f"({sequence}, '{component}', '{component_type}', {column})"
+            for sequence, component, component_type, column in SALARY_COMPONENTS
+        )
+        self.env.cr.execute(f"""
+            CREATE OR REPLACE VIEW {self._table} AS (
+                SELECT p.id * {len(SALARY_COMPONENTS)} + c.sequence AS id,
+                       p.batch_id,
+                       p.id AS payslip_id,
+                       p.employee_id,
+                       e.department_id,
+                       b.company_id,
+                       p.currency_id,
+                       p.date_from,
+                       b.state AS batch_state,
+                       p.state AS payslip_state,
+                       c.sequence,
+                       c.component,
+                       c.component_type,
+                       COALESCE(c.amount, 0) AS amount,
+                       CASE WHEN c.sequence = 1 THEN 1 ELSE 0 END AS payslip_count
+                  FROM my_hr_payslip p
+                  JOIN my_hr_payroll_batch b ON b.id = p.batch_id
+                  JOIN hr_employee e ON e.id = p.employee_id
+                 CROSS JOIN LATERAL (VALUES {components})
+                       AS c(sequence, component, component_type, amount)
+            )
+        """)
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+from odoo import api, fields, models
+
+# Defaults of the variance thresholds (see res.config.settings)
+DEFAULT_NET_THRESHOLD_PCT = 10.0
+DEFAULT_ATTENDANCE_THRESHOLD = 100.0
+
+
+class PayrollVariance(models.Model):
+    _name = 'my_hr.payroll.variance'
+    _description = 'Payroll Batch Variance'
+    _order = 'batch_id, variance_type, abs_net_delta desc, employee_id'
+    _rec_name = 'employee_id'
+
+    batch_id = fields.Many2one(
+        'my_hr.payroll.batch',
+        string='Payroll Batch',
+        required=True,
+        readonly=True,
+        index=True,
+        ondelete='cascade'
+    )
+    employee_id = fields.Many2one('hr.employee', string='Employee', required=True, readonly=True)
+    variance_type = fields.Selection([
+        ('new', 'New Employee'),
+        ('removed', 'Removed Employee'),
+        ('net_change', 'Net Salary Change'),
+        ('attendance_jump', 'Attendance Deduction Jump'),
+    ], string='Variance', required=True, readonly=True)
+    previous_net = fields.Monetary(string='Previous Net', currency_field='currency_id', readonly=True)
+    current_net = fields.Monetary(string='Current Net', currency_field='currency_id', readonly=True)
+    net_delta = fields.Monetary(string='Net Change', currency_field='currency_id', readonly=True)
+    abs_net_delta = fields.Float(string='Absolute Net Change', readonly=True)
+    net_delta_pct = fields.Float(string='Net Change (%)', readonly=True, digits=(10, 1))
+    previous_attendance_deduction = fields.Monetary(
+        string='Previous Attendance Deduction', currency_field='currency_id', readonly=True
+    )
+    current_attendance_deduction = fields.Monetary(
+        string='Current Attendance Deduction', currency_field='currency_id', readonly=True
+    )
+    currency_id = fields.Many2one(related='batch_id.company_id.currency_id')
+
+    @api.model
+    def _get_thresholds(self):
+        ICP = self.env['ir.config_parameter'].sudo()
+        return (
+            float(ICP.get_param('my_hr.variance_net_threshold_pct', DEFAULT_NET_THRESHOLD_PCT)),
+            float(ICP.get_param('my_hr.variance_attendance_threshold', DEFAULT_ATTENDANCE_THRESHOLD)),
+        )
+
+    @api.model
+    def _read_batch_totals(self, batch):
+        """{employee_id: (net, attendance deduction)} of the non-cancelled slips of a batch."""
+        groups = self.env['my_hr.payslip']._read_group(
+            [('batch_id', '=', batch.id), ('state', '!=', 'cancelled')],
+            groupby=['employee_id'],
+            aggregates=['net_salary:sum', 'attendance_deduction:sum'],
+        )
+        return {emp.id: (net or 0.0, deduction or 0.0) for emp, net, deduction in groups}
+
+    @api.model
+    def _prepare_variance_vals(self, batch, previous, current):
+        """
+        Compare two {employee_id: (net, attendance deduction)} maps in one
+        pass and return the vals of the flagged lines.
+        """
+        net_threshold_pct, attendance_threshold = self._get_thresholds()
+        vals_list = []
+        for employee_id in current.keys() | previous.keys():
+            prev_net, prev_deduction = previous.get(employee_id, (0.0, 0.0))
+            cur_net, cur_deduction = current.get(employee_id, (0.0, 0.0))
+            delta = cur_net - prev_net
+            vals = {
+                'batch_id': batch.id,
+                'employee_id': employee_id,
+                'previous_net': prev_net,
+                'current_net': cur_net,
+                'net_delta': delta,
+                'abs_net_delta': abs(delta),
+                'net_delta_pct': delta / prev_net * 100.0 if prev_net else 0.0,
+                'previous_attendance_deduction': prev_deduction,
+                'current_attendance_deduction': cur_deduction,
+            }
+            if employee_id not in previous:
+                vals_list.append(dict(vals, variance_type='new'))
+            elif employee_id not in current:
+                vals_list.append(dict(vals, variance_type='removed'))
+            else:
+                if prev_net and abs(vals['net_delta_pct']) > net_threshold_pct:
+                    vals_list.append(dict(vals, variance_type='net_change'))
+                if cur_deduction - prev_deduction > attendance_threshold:
+                    vals_list.append(dict(vals, variance_type='attendance_jump'))
+        return vals_list
@@ -1,7 +1,79 @@
 # -*- coding: utf-8 -*-
-from datetime import datetime, timedelta
+import logging
+from datetime import datetime, time, timedelta
+from pytz import timezone
 from odoo import api, fields, models
 from odoo.exceptions import UserError, ValidationError
+from .perf_stat import profiled
+
+_logger = logging.getLogger(__name__)
+
+SALARY_INPUT_FIELDS = [
+    'basic_salary',
+    'housing_allowance',
+    'transport_allowance',
+    'gosi_rate',
+    'exempt_from_deduction',
+]
+# Payslip columns written by the payroll engine, as returned by compute_salary_values()
+SALARY_VALUE_FIELDS = [
+    'basic_salary',
+    'housing_allowance',
+    'transport_allowance',
+    'gross_salary',
+    'gosi_deduction',
+    'missing_hours',
+    'attendance_deduction',
+    'net_salary',
+]
+
+
+def compute_salary_values(inputs, actual_hours, expected_hours):
+    """
+    Pure payroll arithmetic for one employee.
+    ``inputs`` holds the SALARY_INPUT_FIELDS values of the employee.
+    Returns the values to write on the payslip.
+    """
+    basic = inputs['basic_salary'] or 0.0
+    housing = inputs['housing_allowance'] or 0.0
+    transport = inputs['transport_allowance'] or 0.0
+    gross = basic + housing + transport
+
+    # GOSI on basic only
+    gosi = basic * (inputs['gosi_rate'] or 0.0) / 100.0
+
+    # Attendance deduction
+    attendance_deduction = 0.0
+    missing_hours = 0.0
+    if not inputs['exempt_from_deduction']:
+        missing_hours = max(0.0, expected_hours - actual_hours)
+        if missing_hours > 0:
+            # Hourly rate = (Gross / 30) / 8
+            hourly_rate = (gross / 30.0) / 8.0
+            attendance_deduction = missing_hours * hourly_rate
+
+    net = gross - gosi - attendance_deduction
+    return {
+        'basic_salary': basic,
+        'housing_allowance': housing,
+        'transport_allowance': transport,
+        'gross_salary': gross,
+        'gosi_deduction': gosi,
+        'missing_hours': missing_hours,
+        'attendance_deduction': attendance_deduction,
+        'net_salary': max(0.0, net),
+    }
+
+
+def compute_salary_chunk(rows):
+    """
+    Compute a chunk of slips from plain data.
+    ``rows`` is a list of (slip_id, inputs, actual_hours, expected_hours) tuples.
+    """
+    return [
+        (slip_id, compute_salary_values(inputs, actual_hours, expected_hours))
+        for slip_id, inputs, actual_hours, expected_hours in rows
+    ]
 
 
 class MyHrPayslip(models.Model):
@@ -16,11 +88,12 @@ class MyHrPayslip(models.Model):
         'my_hr.payroll.batch',
         string='Payroll Batch',
         required=True,
+        index=True,
         ondelete='cascade'
     )
     employee_id = fields.Many2one(
         'hr.employee', string='Employee',
-        required=True, tracking=True
+        required=True, index=True, tracking=True
     )
     date_from = fields.Date(string='Period Start', required=True)
     date_to = fields.Date(string='Period End', required=True)
@@ -80,6 +153,28 @@ class MyHrPayslip(models.Model):
         store=True
     )
     notes = fields.Text(string='Notes')
+    is_stale = fields.Boolean(
+        string='Needs Recompute',
+        readonly=True,
+        copy=False,
+        index=True,
+        help='Attendance or salary data changed since this payslip was computed.'
+    )
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        slips = super().create(vals_list)
+        self.env['hr.employee']._my_hr_invalidate_dashboard(slips.employee_id.ids)
+        return slips
+
+    def write(self, vals):
+        res = super().write(vals)
+        self.env['hr.employee']._my_hr_invalidate_dashboard(self.employee_id.ids)
+        return res
+
+    def unlink(self):
+        self.env['hr.employee']._my_hr_invalidate_dashboard(self.employee_id.ids)
+        return super().unlink()
 
     @api.depends('employee_id', 'date_from', 'date_to')
     def _compute_display_name(self):
@@ -89,76 +184,199 @@ class MyHrPayslip(models.Model):
             else:
                 slip.display_name = 'New Payslip'
 
+    @profiled('my_hr.payslip.action_compute')
     def action_compute(self):
-        for slip in self:
-            emp = slip.employee_id
-            if not emp:
-                continue
-
-            basic = emp.basic_salary or 0.0
-            housing = emp.housing_allowance or 0.0
-            transport = emp.transport_allowance or 0.0
-            gross = basic + housing + transport
-
-            # GOSI on basic only
-            gosi = basic * (emp.gosi_rate or 0.0) / 100.0
-
-            # Attendance deduction
-            attendance_deduction = 0.0
-            missing_hours = 0.0
-
-            if not emp.exempt_from_deduction:
-                # Calculate expected working hours in period
-                # Standard: 8 hours/day, 22 working days/month
-                date_from_dt = datetime.combine(slip.date_from, datetime.min.time())
-                date_to_dt = datetime.combine(slip.date_to, datetime.max.time())
-
-                attendances = self.env['hr.attendance'].search([
-                    ('employee_id', '=', emp.id),
-                    ('check_in', '>=', date_from_dt),
-                    ('check_in', '<=', date_to_dt),
-                ])
-                actual_hours = sum(a.worked_hours for a in attendances)
-
-                # Count working days in period (Mon-Fri)
-                period_days = (slip.date_to - slip.date_from).days + 1
-                working_days = sum(
-                    1 for i in range(period_days)
-                    if (slip.date_from + timedelta(days=i)).weekday() < 5
+        self._compute_payslips()
+
+    def _compute_payslips(self):
+        """
+        Set-based payroll engine.
+        Slips are grouped by period; for each period the salary inputs are
+        fetched in one query and worked hours are summed per employee in one
+        aggregated query. Expected hours come from each employee's working
+        calendar and are computed once per (calendar, period) for the run.
+        The arithmetic runs on that plain data in the server process (it
+        costs less than pickling the rows to other processes would), and
+        the results are written back in a single UPDATE.
+        """
+        slips = self.filtered('employee_id')
+        rows = []
+        expected_cache = {}
+        periods = slips.grouped(lambda s: (s.date_from, s.date_to))
+        for (date_from, date_to), period_slips in periods.items():
+            employees = period_slips.employee_id
+            inputs = self._read_salary_inputs(employees)
+            worked_hours = self._read_worked_hours(
+                employees.filtered(lambda e: not inputs[e.id]['exempt_from_deduction']),
+                date_from, date_to,
+            )
+            expected_hours = self._read_expected_hours(employees, date_from, date_to, expected_cache)
+            rows += [
+                (
+                    slip.id,
+                    inputs[slip.employee_id.id],
+                    worked_hours.get(slip.employee_id.id, 0.0),
+                    expected_hours[slip.employee_id.id],
                 )
-                expected_hours = working_days * 8.0
-                missing_hours = max(0.0, expected_hours - actual_hours)
-
-                if missing_hours > 0:
-                    # Hourly rate = (Gross / 30) / 8
-                    hourly_rate = (gross / 30.0) / 8.0
-                    attendance_deduction = missing_hours * hourly_rate
-
-            net = gross - gosi - attendance_deduction
-
-            slip.write({
-                'basic_salary': basic,
-                'housing_allowance': housing,
-                'transport_allowance': transport,
-                'gross_salary': gross,
-                'gosi_deduction': gosi,
-                'missing_hours': missing_hours,
-                'attendance_deduction': attendance_deduction,
-                'net_salary': max(0.0, net),
-            })
+                for slip in period_slips
+            ]
+
+        self._write_salary_values(compute_salary_chunk(rows))
+
+    def _write_salary_values(self, results):
+        """
+        Write (slip_id, vals) results in one UPDATE joined on the unnested
+        values, whatever the number of slips. Recomputing figures is not a
+        user change, so no net_salary tracking message is posted.
+        """
+        if not results:
+            return
+        slips = self.browse([slip_id for slip_id, _vals in results])
+        slips.flush_recordset(SALARY_VALUE_FIELDS + ['is_stale'])
+        slips.fetch(['currency_id', 'employee_id'])
+        # Monetary amounts are rounded like write() does
+        monetary = [fname for fname in SALARY_VALUE_FIELDS if self._fields[fname].type == 'monetary']
+        columns = {fname: [] for fname in SALARY_VALUE_FIELDS}
+        for slip, (_slip_id, vals) in zip(slips, results):
+            currency = slip.currency_id
+            for fname in SALARY_VALUE_FIELDS:
+                value = vals[fname]
+                columns[fname].append(currency.round(value) if currency and fname in monetary else value)
+
+        self.env.cr.execute(f"""
+            UPDATE my_hr_payslip p
+               SET {', '.join(f'{fname} = v.{fname}' for fname in SALARY_VALUE_FIELDS)},
+                   is_stale = FALSE,
+                   write_uid = %(uid)s,
+                   write_date = (now() at time zone 'UTC')
+              FROM unnest(%(ids)s::int[], {', '.join(f'%({fname})s::numeric[]' for fname in SALARY_VALUE_FIELDS)})
+                   AS v(id, {', '.join(SALARY_VALUE_FIELDS)})
+             WHERE p.id = v.id
+        """, dict(columns, uid=self.env.uid, ids=slips.ids))
+        # Keep the ORM cache and the fields computed from the slips consistent
+        slips.invalidate_recordset(SALARY_VALUE_FIELDS + ['is_stale', 'write_uid', 'write_date'])
+        slips.modified(SALARY_VALUE_FIELDS + ['is_stale'])
+        self.env['hr.employee']._my_hr_invalidate_dashboard(slips.employee_id.ids)
+
+    @api.model
+    def _mark_stale(self, employee_dates):
+        """
+        Flag the draft payslips of draft batches affected by a data change.
+        ``employee_dates`` maps employee ids to the set of changed dates, or
+        to None when the whole period is affected (salary data change).
+        """
+        if not employee_dates:
+            return
+        slips = self.sudo().search([
+            ('employee_id', 'in', list(employee_dates)),
+            ('state', '=', 'draft'),
+            ('batch_id.state', '=', 'draft'),
+            ('is_stale', '=', False),
+        ])
+
+        def is_affected(slip):
+            dates = employee_dates[slip.employee_id.id]
+            return dates is None or any(slip.date_from <= d <= slip.date_to for d in dates)
+
+        slips.filtered(is_affected).write({'is_stale': True})
+
+    @api.model
+    def _read_salary_inputs(self, employees):
+        """Return {employee_id: {field: value}} for the salary input fields."""
+        employees.fetch(SALARY_INPUT_FIELDS)
+        return {
+            emp.id: {fname: emp[fname] for fname in SALARY_INPUT_FIELDS}
+            for emp in employees
+        }
+
+    @api.model
+    def _read_worked_hours(self, employees, date_from, date_to):
+        """
+        Return {employee_id: worked hours} over the period, in one query on
+        the daily attendance summary.
+        """
+        if not employees:
+            return {}
+        groups = self.env['my_hr.attendance.daily']._read_group(
+            [
+                ('employee_id', 'in', employees.ids),
+                ('date', '>=', date_from),
+                ('date', '<=', date_to),
+            ],
+            groupby=['employee_id'],
+            aggregates=['worked_hours:sum'],
+        )
+        return {emp.id: hours or 0.0 for emp, hours in groups}
+
+    @api.model
+    def _read_expected_hours(self, employees, date_from, date_to, cache=None):
+        """
+        Return {employee_id: expected hours} over the period, from the
+        employee's working calendar (or its company's), public holidays
+        excluded. Each (calendar, period) is computed once and kept in
+        ``cache``, which callers share across the periods of a run.
+        """
+        cache = {} if cache is None else cache
+        employees.fetch(['resource_calendar_id', 'company_id'])
+        employees.company_id.fetch(['resource_calendar_id'])
+        expected = {}
+        for employee in employees:
+            calendar = employee.resource_calendar_id or employee.company_id.resource_calendar_id
+            key = (calendar.id, date_from, date_to)
+            if key not in cache:
+                cache[key] = (
+                    self._get_calendar_hours(calendar, date_from, date_to) if calendar
+                    else self._get_expected_hours(date_from, date_to)
+                )
+            expected[employee.id] = cache[key]
+        return expected
+
+    @api.model
+    def _get_calendar_hours(self, calendar, date_from, date_to):
+        """Working hours of the calendar in the period, public holidays excluded."""
+        tz = timezone(calendar.tz or 'UTC')
+        start = tz.localize(datetime.combine(date_from, time.min))
+        end = tz.localize(datetime.combine(date_to, time.max))
+        return calendar.get_work_hours_count(start, end, compute_leaves=True)
+
+    @api.model
+    def _get_expected_hours(self, date_from, date_to):
+        """
+        Expected working hours in the period (Mon-Fri, 8 hours/day), for
+        employees without any working calendar.
+        """
+        period_days = (date_to - date_from).days + 1
+        working_days = sum(
+            1 for i in range(period_days)
+            if (date_from + timedelta(days=i)).weekday() < 5
+        )
+        return working_days * 8.0
 
     def action_confirm(self):
-        for slip in self:
-            if slip.state != 'draft':
-                raise UserError('Only Draft payslips can be confirmed.')
-            slip.state = 'confirmed'
+        if self.filtered(lambda slip: slip.state != 'draft'):
+            raise UserError('Only Draft payslips can be confirmed.')
+        self._write_state('confirmed')
 
     def action_reset_draft(self):
-        for slip in self:
-            slip.state = 'draft'
+        self._write_state('draft')
 
     def action_cancel(self):
-        for slip in self:
-            if slip.state == 'confirmed' and slip.batch_id.state == 'published':
-                raise UserError('Cannot cancel a payslip in a published batch.')
-            slip.state = 'cancelled'
\ No newline at end of file
+        if self.filtered(lambda slip: slip.state == 'confirmed' and slip.batch_id.state == 'published'):
+            raise UserError('Cannot cancel a payslip in a published batch.')
+        self._write_state('cancelled')
+
+    def _write_state(self, state):
+        """
+        Set the state of all the slips in one write, without per-slip
+        tracking messages; each batch gets one summary note instead.
+        """
+        slips = self.filtered(lambda slip: slip.state != state)
+        if not slips:
+            return
+        slips.with_context(tracking_disable=True).write({'state': state})
+        label = dict(self._fields['state'].selection)[state]
+        for batch, batch_slips in slips.grouped('batch_id').items():
+            batch.message_post(
+                body=f"{len(batch_slips)} payslip(s) set to {label} by {self.env.user.name}.",
+                subtype_xmlid='mail.mt_note'
+            )
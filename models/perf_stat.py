@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+import functools
+import logging
+import time
+from odoo import SUPERUSER_ID, api, fields, models
+from odoo.http import request
+
+_logger = logging.getLogger(__name__)
+
+# Days of measurements kept, and the most rows kept in any case
+PERF_STAT_RETENTION_DAYS = 14
+PERF_STAT_MAX_ROWS = 100000
+
+# Tuples read and written by the current transaction
+XACT_ROWS_QUERY = """
+    SELECT COALESCE(SUM(seq_tup_read + COALESCE(idx_tup_fetch, 0)), 0),
+           COALESCE(SUM(n_tup_ins + n_tup_upd + n_tup_del), 0)
+      FROM pg_stat_xact_user_tables
+"""
+
+
+class profiled:
+    """
+    Measure wall time, SQL queries and rows read/written of a call and
+    store them in my_hr.perf.stat, when the my_hr.profiling system
+    parameter is set. Disabled, it costs one cached parameter lookup.
+
+    Use as a decorator on model methods and controller routes::
+
+        @profiled('my_hr.payslip.action_compute')
+        def action_compute(self): ...
+
+    or as a context manager, given an environment::
+
+        with profiled('my_hr.some_step', env):
+            ...
+
+    Queries and rows are counted on the cursor of the environment; work
+    done in other cursors is not included, and row counts restart after a
+    commit inside the call.
+    """
+
+    def __init__(self, name, env=None):
+        self.name = name
+        self.env = env
+        self._start = None
+
+    def __call__(self, func):
+        @functools.wraps(func)
+        def wrapper(obj, *args, **kwargs):
+            env = obj.env if isinstance(obj, models.BaseModel) else (request and request.env)
+            with profiled(self.name, env):
+                return func(obj, *args, **kwargs)
+        return wrapper
+
+    def __enter__(self):
+        env = self.env
+        if env is None or not env['ir.config_parameter'].sudo().get_param('my_hr.profiling'):
+            return self
+        cr = env.cr
+        cr.execute(XACT_ROWS_QUERY)
+        self._rows = cr.fetchone()
+        self._queries = cr.sql_log_count
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self._start is None:
+            return False
+        duration = time.perf_counter() - self._start
+        cr = self.env.cr
+        queries = cr.sql_log_count - self._queries
+        try:
+            cr.execute(XACT_ROWS_QUERY)
+            rows_read, rows_written = (
+                max(0, after - before) for after, before in zip(cr.fetchone(), self._rows)
+            )
+        except Exception:
+            # The transaction is aborted, the call failed in SQL
+            rows_read = rows_written = 0
+        self._start = None
+        vals = {
+            'name': self.name,
+            'duration_ms': duration * 1000,
+            'query_count': queries,
+            'rows_read': rows_read,
+            'rows_written': rows_written,
+            'user_id': self.env.uid,
+            'failed': exc_type is not None,
+        }
+        # Own cursor: kept when the call rolls back, and not mixed with its queries
+        try:
+            with self.env.registry.cursor() as stat_cr:
+                api.Environment(stat_cr, SUPERUSER_ID, {})['my_hr.perf.stat'].create(vals)
+        except Exception:
+            _logger.warning('my_hr: could not record profile of %s', self.name, exc_info=True)
+        return False
+
+
+class PerfStat(models.Model):
+    _name = 'my_hr.perf.stat'
+    _description = 'My HR Performance Measurement'
+    _order = 'duration_ms desc'
+    _rec_name = 'name'
+
+    name = fields.Char(string='Call', required=True, readonly=True, index=True)
+    duration_ms = fields.Float(string='Duration (ms)', readonly=True, digits=(16, 1), aggregator='avg')
+    query_count = fields.Integer(string='SQL Queries', readonly=True, aggregator='avg')
+    rows_read = fields.Integer(string='Rows Read', readonly=True, aggregator='avg')
+    rows_written = fields.Integer(string='Rows Written', readonly=True, aggregator='avg')
+    user_id = fields.Many2one('res.users', string='User', readonly=True, ondelete='set null')
+    failed = fields.Boolean(string='Failed', readonly=True)
+
+    @api.autovacuum
+    def _gc_perf_stats(self):
+        """Keep the last PERF_STAT_RETENTION_DAYS days, at most PERF_STAT_MAX_ROWS rows."""
+        self.env.cr.execute("""
+            DELETE FROM my_hr_perf_stat
+             WHERE create_date < NOW() AT TIME ZONE 'UTC' - make_interval(days => %s)
+                OR id <= (SELECT id FROM my_hr_perf_stat ORDER BY id DESC OFFSET %s LIMIT 1)
+        """, (PERF_STAT_RETENTION_DAYS, PERF_STAT_MAX_ROWS))
+        _logger.info('my_hr: removed %s old performance measurements', self.env.cr.rowcount)
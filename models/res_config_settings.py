@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+from odoo import fields, models
+
+
+class ResConfigSettings(models.TransientModel):
+    _inherit = 'res.config.settings'
+
+    my_hr_payroll_chunk_size = fields.Integer(
+        string='Payslip Generation Chunk Size',
+        config_parameter='my_hr.payroll_chunk_size',
+        default=500,
+        help='Number of employees processed per committed chunk when payslips '
+             'are generated in the background.'
+    )
+    my_hr_variance_net_threshold_pct = fields.Float(
+        string='Net Change Threshold (%)',
+        config_parameter='my_hr.variance_net_threshold_pct',
+        default=10.0,
+        help='Net salary changes against the previous published batch above '
+             'this percentage are flagged.'
+    )
+    my_hr_variance_attendance_threshold = fields.Float(
+        string='Attendance Deduction Jump',
+        config_parameter='my_hr.variance_attendance_threshold',
+        default=100.0,
+        help='Attendance deduction increases above this amount are flagged.'
+    )
+    my_hr_profiling = fields.Boolean(
+        string='Record Performance Statistics',
+        config_parameter='my_hr.profiling',
+        help='Record duration, SQL queries and rows of payroll, accrual, '
+             'check-in and dashboard calls.'
+    )
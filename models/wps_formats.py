@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+"""
+Registry of WPS / bank salary file formats.
+
+Each format declares its header, detail and trailer records as a list of
+fields (width, alignment, fill). WpsFormat renders detail records column
+by column and can parse its own lines back for validation.
+"""
+from collections import namedtuple
+
+# kind: 'text' (free text), 'amount' (cents, digits only),
+#       'decimal' (two decimals with a dot), 'int' (integer)
+WpsField = namedtuple('WpsField', 'name width kind align fill const')
+
+
+def field(name, width=None, kind='text', align=None, fill=None, const=None):
+    if align is None:
+        align = 'left' if kind == 'text' else 'right'
+    if fill is None:
+        fill = ' ' if kind in ('text', 'decimal') else '0'
+    return WpsField(name, width, kind, align, fill, const)
+
+
+def const(value):
+    return WpsField(None, len(value), 'text', 'left', ' ', value)
+
+
+def reserved(width):
+    return WpsField(None, width, 'text', 'left', ' ', '')
+
+
+class WpsFormat:
+
+    def __init__(self, code, name, detail, header=None, trailer=None,
+                 separator='', line_end='\r\n', extension='txt'):
+        self.code = code
+        self.name = name
+        self.header = header
+        self.detail = detail
+        self.trailer = trailer
+        self.separator = separator
+        self.line_end = line_end
+        self.extension = extension
+
+    # ---- Rendering ----
+
+    def _render_column(self, spec, values):
+        """Format a whole column of values for one field at once."""
+        if spec.kind == 'amount':
+            values = [f"{v or 0.0:.2f}".replace('.', '') for v in values]
+        elif spec.kind == 'decimal':
+            values = [f"{v or 0.0:.2f}" for v in values]
+        else:
+            values = [str(v) if v not in (None, False) else '' for v in values]
+            if self.separator:
+                sep = self.separator
+                values = [v.replace(sep, ' ') for v in values]
+        if spec.width is None or self.separator:
+            return values
+        width, fill = spec.width, spec.fill
+        if spec.align == 'left':
+            return [v.ljust(width, fill)[:width] for v in values]
+        return [v.rjust(width, fill)[:width] for v in values]
+
+    def render_records(self, specs, columns, count):
+        """
+        Render ``count`` records of the given field specs.
+        ``columns`` maps field names to lists of values.
+        """
+        rendered = []
+        for spec in specs:
+            if spec.const is not None:
+                rendered.append([self._render_const(spec)] * count)
+            else:
+                rendered.append(self._render_column(spec, columns[spec.name]))
+        return list(map(self.separator.join, zip(*rendered)))
+
+    def _render_const(self, spec):
+        if self.separator:
+            return spec.const
+        return spec.const.ljust(spec.width)
+
+    def render_record(self, specs, values):
+        columns = {key: [value] for key, value in values.items()}
+        return self.render_records(specs, columns, 1)[0]
+
+    def render_header(self, values):
+        return self.render_record(self.header, values) if self.header else None
+
+    def render_details(self, columns, count):
+        return self.render_records(self.detail, columns, count)
+
+    def render_trailer(self, values):
+        return self.render_record(self.trailer, values) if self.trailer else None
+
+    # ---- Parsing ----
+
+    def _split(self, specs, line):
+        if self.separator:
+            return line.split(self.separator)
+        parts, pos = [], 0
+        for spec in specs:
+            parts.append(line[pos:pos + spec.width])
+            pos += spec.width
+        return parts
+
+    def _record_specs(self, line):
+        for specs in (self.header, self.detail, self.trailer):
+            if not specs:
+                continue
+            tag = specs[0].const
+            if self.separator:
+                if line.split(self.separator, 1)[0] == tag:
+                    return specs
+            elif line.startswith(tag):
+                return specs
+        raise ValueError(f'Unknown record: {line[:20]!r}')
+
+    def parse_line(self, line):
+        """Parse one line back into (record specs, {field name: value})."""
+        specs = self._record_specs(line)
+        parts = self._split(specs, line)
+        if len(parts) != len(specs):
+            raise ValueError(f'Expected {len(specs)} fields, got {len(parts)}: {line[:20]!r}')
+        values = {}
+        for spec, raw in zip(specs, parts):
+            if spec.name is None:
+                continue
+            raw = raw.strip()
+            if spec.kind == 'amount':
+                values[spec.name] = int(raw or 0) / 100.0
+            elif spec.kind == 'decimal':
+                values[spec.name] = float(raw or 0)
+            elif spec.kind == 'int':
+                values[spec.name] = int(raw or 0)
+            else:
+                values[spec.name] = raw
+        return specs, values
+
+    def validate(self, lines):
+        """
+        Parse every line and check the trailer count and total against the
+        detail records. Raises ValueError on the first inconsistency.
+        """
+        count, total, trailer = 0, 0.0, None
+        for line in lines:
+            specs, values = self.parse_line(line)
+            if specs is self.detail:
+                count += 1
+                total += values['amount']
+            elif specs is self.trailer:
+                trailer = values
+        if self.trailer:
+            if trailer is None:
+                raise ValueError('Missing trailer record.')
+            if trailer['count'] != count:
+                raise ValueError(f"Trailer count {trailer['count']} does not match {count} detail records.")
+            if round(trailer['total'] - total, 2):
+                raise ValueError(f"Trailer total {trailer['total']:.2f} does not match details {total:.2f}.")
+        return count, total
+
+
+WPS_FORMATS = {}
+
+
+def register_wps_format(wps_format):
+    WPS_FORMATS[wps_format.code] = wps_format
+    return wps_format
+
+
+def get_wps_format(code):
+    return WPS_FORMATS[code]
+
+
+def wps_format_selection():
+    return [(code, fmt.name) for code, fmt in WPS_FORMATS.items()]
+
+
+# HRSD fixed-width layout
+register_wps_format(WpsFormat(
+    'hrsd', 'HRSD WPS (fixed width)',
+    header=[
+        const('H'),
+        field('employer_id', 10),
+        field('file_date', 8),
+        field('currency', 3),
+        reserved(52),
+    ],
+    detail=[
+        const('D'),
+        field('employee_code', 15),
+        field('iban', 24),
+        field('amount', 15, kind='amount'),
+        field('name', 40),
+        field('salary_month', 6),
+        reserved(5),
+    ],
+    trailer=[
+        const('T'),
+        field('count', 6, kind='int'),
+        field('total', 15, kind='amount'),
+        reserved(45),
+    ],
+))
+
+# Salary Information File: comma separated EDR rows and an SCR control row
+register_wps_format(WpsFormat(
+    'sif', 'SIF (CSV)',
+    separator=',',
+    line_end='\r\n',
+    extension='csv',
+    detail=[
+        const('EDR'),
+        field('employee_code'),
+        field('iban'),
+        field('period_start'),
+        field('period_end'),
+        field('amount', kind='decimal'),
+        field('name'),
+    ],
+    trailer=[
+        const('SCR'),
+        field('employer_id'),
+        field('file_date'),
+        field('salary_month'),
+        field('count', kind='int'),
+        field('total', kind='decimal'),
+        field('currency'),
+    ],
+))
+
+# SARIE-style fixed width: full IBAN length and decimal amounts
+register_wps_format(WpsFormat(
+    'sarie', 'SARIE (fixed width)',
+    header=[
+        const('000'),
+        field('employer_id', 15),
+        field('file_date', 8),
+        field('currency', 3),
+        field('salary_month', 6),
+        reserved(25),
+    ],
+    detail=[
+        const('111'),
+        field('employee_code', 15),
+        field('iban', 34),
+        field('amount', 18, kind='decimal', fill='0'),
+        field('name', 35),
+        reserved(10),
+    ],
+    trailer=[
+        const('999'),
+        field('count', 8, kind='int'),
+        field('total', 18, kind='decimal', fill='0'),
+        reserved(31),
+    ],
+))
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmarks of the my_hr set-based code paths.
+
+Runs in-process against a database with my_hr installed, with the Odoo
+sources importable (run it with the Python of the Odoo install). All the
+data it creates is rolled back at the end, so any database can be used.
+
+    # per-slip cost of the payroll engine from 100 to 10,000 employees
+    python3 my_hr_benchmark.py -c odoo.conf -d bench payroll --sizes 100 1000 10000
+
+    # rendering of 100,000 WPS detail records in every registered format
+    python3 my_hr_benchmark.py -c odoo.conf wps --sizes 100000
+
+    # daily leave accrual: set-based run against the former per-employee loop
+    python3 my_hr_benchmark.py -c odoo.conf -d bench accrual --sizes 100 1000 10000
+
+    # employee dashboard payload, built and served from the cache
+    python3 my_hr_benchmark.py -c odoo.conf -d bench dashboard --sizes 100 1000
+
+    # save the results, and compare a later run with them
+    python3 my_hr_benchmark.py -c odoo.conf -d bench --output run.json payroll
+    python3 my_hr_benchmark.py -c odoo.conf -d bench --compare run.json payroll
+
+Each benchmark times its steps and counts their SQL queries on the
+cursor; the ORM cache is flushed and cleared before each step so a step
+never benefits from the one before.
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+BENCHMARKS = {}
+
+
+def benchmark(name, help, sizes=(100, 1000, 10000), database=True):
+    """
+    Register a benchmark: func(env, args) -> list of result rows (dicts).
+    Benchmarks that do not need a database get env=None.
+    """
+    def decorator(func):
+        BENCHMARKS[name] = (func, help, list(sizes), database)
+        return func
+    return decorator
+
+
+def measure(env, func, *args, **kwargs):
+    """Run func cold and return (seconds, SQL queries), flush included."""
+    env.flush_all()
+    env.invalidate_all()
+    queries = env.cr.sql_log_count
+    start = time.perf_counter()
+    func(*args, **kwargs)
+    env.flush_all()
+    return time.perf_counter() - start, env.cr.sql_log_count - queries
+
+
+def seed_employees(env, count, prefix):
+    """Employees with salary data on the company's working calendar."""
+    return env['hr.employee'].with_context(tracking_disable=True).create([{
+        'name': f'{prefix} {i:05d}',
+        'basic_salary': 4000.0 + (i % 97) * 125.0,
+        'housing_value': 1000.0 + (i % 13) * 50.0,
+        'transport_value': 400.0 + (i % 7) * 25.0,
+        'gosi_rate': 9.75,
+    } for i in range(count)])
+
+
+def last_month():
+    month_end = date.today().replace(day=1) - timedelta(days=1)
+    return month_end.replace(day=1), month_end
+
+
+@benchmark('payroll', 'per-slip cost of the payroll engine')
+def bench_payroll(env, args):
+    from odoo.addons.my_hr.models.payslip import SALARY_VALUE_FIELDS, compute_salary_chunk
+
+    date_from, date_to = last_month()
+    Payslip = env['my_hr.payslip']
+    results = []
+    for size in args.sizes:
+        employees = seed_employees(env, size, f'bench payroll {size}')
+        # Some worked hours, so that deductions differ between employees
+        env['hr.attendance'].create([{
+            'employee_id': employee.id,
+            'check_in': datetime.combine(date_from + timedelta(days=day), datetime.min.time()) + timedelta(hours=6),
+            'check_out': datetime.combine(date_from + timedelta(days=day), datetime.min.time())
+                         + timedelta(hours=10 + index % 5),
+        } for index, employee in enumerate(employees) for day in range(3)])
+        batch = env['my_hr.payroll.batch'].create({
+            'name': f'Benchmark {size}', 'date_from': date_from, 'date_to': date_to,
+        })
+        slips = Payslip.create(batch._prepare_payslip_vals(employees))
+
+        seconds, queries = measure(env, slips._compute_payslips)
+        # The pure arithmetic share of the engine, on the same inputs
+        inputs = Payslip._read_salary_inputs(employees)
+        rows = [(slip.id, inputs[slip.employee_id.id], 12.0, 176.0) for slip in slips]
+        arithmetic_seconds, _queries = measure(env, compute_salary_chunk, rows)
+        values = [(slip.id, {fname: slip[fname] for fname in SALARY_VALUE_FIELDS}) for slip in slips]
+
+        # Write-back alone: the engine's single UPDATE against one write() per
+        # slip, which is what grouping by identical values amounts to once
+        # salaries differ
+        write_seconds, write_queries = measure(env, Payslip._write_salary_values, values)
+
+        def write_per_slip():
+            for slip_id, vals in values:
+                Payslip.with_context(tracking_disable=True).browse(slip_id).write(vals)
+        orm_seconds, orm_queries = measure(env, write_per_slip)
+
+        results.append({
+            'size': size,
+            'compute_ms': round(seconds * 1000, 1),
+            'compute_us_per_slip': round(seconds / size * 1e6, 1),
+            'compute_queries': queries,
+            'arithmetic_ms': round(arithmetic_seconds * 1000, 1),
+            'write_ms': round(write_seconds * 1000, 1),
+            'write_queries': write_queries,
+            'orm_write_ms': round(orm_seconds * 1000, 1),
+            'orm_write_queries': orm_queries,
+        })
+    return results
+
+
+def accrue_per_employee(env, accrual_types, day, days):
+    """The per-employee loop the set-based accrual replaced, for comparison."""
+    Allocation = env['hr.leave.allocation']
+    employees = env['hr.employee'].search([('active', '=', True)])
+    for leave_type in accrual_types:
+        for employee in employees:
+            allocation = Allocation.search([
+                ('employee_id', '=', employee.id),
+                ('holiday_status_id', '=', leave_type.id),
+                ('state', '=', 'validate'),
+                ('date_from', '<=', day),
+                '|',
+                ('date_to', '=', False),
+                ('date_to', '>=', day),
+            ], limit=1)
+            if allocation:
+                allocation.sudo().write({'number_of_days': (allocation.number_of_days or 0.0) + days})
+
+
+@benchmark('accrual', 'daily leave accrual, set-based against the per-employee loop')
+def bench_accrual(env, args):
+    LeaveType = env['hr.leave.type']
+    # Only the benchmark's leave type accrues during the run
+    LeaveType.search([('my_hr_accrual', '=', True)]).write({'my_hr_accrual': False})
+    accrual_type = LeaveType.create({'name': 'Benchmark Accrual', 'my_hr_accrual': True})
+    today = date.today()
+    results = []
+    seeded = env['hr.employee']
+    for size in sorted(args.sizes):
+        # Sizes are cumulative: both variants see every seeded employee
+        employees = seed_employees(env, size - len(seeded), f'bench accrual {size}')
+        seeded |= employees
+        allocations = env['hr.leave.allocation'].create([{
+            'name': 'Benchmark allocation',
+            'employee_id': employee.id,
+            'holiday_status_id': accrual_type.id,
+            'number_of_days': 0.0,
+            'date_from': today - timedelta(days=30),
+        } for employee in employees])
+        allocations.sudo().write({'state': 'validate'})
+        # The ledger must be empty for today, or the set-based run has nothing to do
+        env['my_hr.leave.accrual.line'].search([('date', '=', today)]).unlink()
+
+        set_seconds, set_queries = measure(env, LeaveType.run_daily_accrual)
+        loop_seconds, loop_queries = measure(env, accrue_per_employee, env, accrual_type, today, 30.0 / 365.0)
+        results.append({
+            'size': len(seeded),
+            'set_ms': round(set_seconds * 1000, 1),
+            'set_queries': set_queries,
+            'loop_ms': round(loop_seconds * 1000, 1),
+            'loop_queries': loop_queries,
+            'speedup': round(loop_seconds / set_seconds, 1) if set_seconds else None,
+        })
+    return results
+
+
+@benchmark('dashboard', 'employee dashboard payload, cold and cached', sizes=(100, 1000))
+def bench_dashboard(env, args):
+    from odoo.addons.my_hr.models.hr_employee_dashboard import dashboard_cache
+
+    month_start = date.today().replace(day=1)
+    results = []
+    for size in args.sizes:
+        employees = seed_employees(env, size, f'bench dashboard {size}')
+        env['hr.attendance'].create([{
+            'employee_id': employee.id,
+            'check_in': datetime.combine(month_start, datetime.min.time()) + timedelta(hours=6),
+            'check_out': datetime.combine(month_start, datetime.min.time()) + timedelta(hours=14),
+        } for employee in employees])
+        dashboard_cache.evict(env.cr.dbname)
+
+        def serve_all():
+            for employee in employees:
+                employee._get_my_hr_dashboard_data()
+        cold_seconds, cold_queries = measure(env, serve_all)
+        cached_seconds, cached_queries = measure(env, serve_all)
+        results.append({
+            'size': size,
+            'cold_ms_per_request': round(cold_seconds / size * 1000, 2),
+            'cold_queries_per_request': round(cold_queries / size, 1),
+            'cached_ms_per_request': round(cached_seconds / size * 1000, 2),
+            'cached_queries_per_request': round(cached_queries / size, 1),
+        })
+    return results
+
+
+@benchmark('wps', 'rendering and validation of WPS files', sizes=(100000,), database=False)
+def bench_wps(env, args):
+    from odoo.addons.my_hr.models.wps_formats import WPS_FORMATS
+
+    results = []
+    for size in args.sizes:
+        columns = {
+            'iban': [f'SA{i:022d}' for i in range(size)],
+            'employee_code': [f'{1000000000 + i}' for i in range(size)],
+            'name': [f'Employee {i:06d}' for i in range(size)],
+            'amount': [4000.0 + (i % 997) * 12.35 for i in range(size)],
+            'salary_month': ['202501'] * size,
+            'period_start': ['2025-01-01'] * size,
+            'period_end': ['2025-01-31'] * size,
+        }
+        file_values = {
+            'employer_id': '3001234567', 'file_date': '20250131',
+            'currency': 'SAR', 'salary_month': '202501',
+            'count': size, 'total': sum(columns['amount']),
+        }
+        for code, wps_format in WPS_FORMATS.items():
+            start = time.perf_counter()
+            lines = [wps_format.render_header(file_values)] if wps_format.header else []
+            lines += wps_format.render_details(columns, size)
+            lines.append(wps_format.render_trailer(file_values))
+            render_seconds = time.perf_counter() - start
+
+            start = time.perf_counter()
+            wps_format.validate(lines)
+            validate_seconds = time.perf_counter() - start
+            results.append({
+                'size': size,
+                'format': code,
+                'render_ms': round(render_seconds * 1000, 1),
+                'render_us_per_row': round(render_seconds / size * 1e6, 2),
+                'validate_ms': round(validate_seconds * 1000, 1),
+                'bytes': sum(len(line) + len(wps_format.line_end) for line in lines),
+            })
+    return results
+
+
+def print_results(name, rows, baseline=None):
+    if not rows:
+        return
+    columns = list(rows[0])
+    print(name)
+    print('  '.join(f'{column:>20}' for column in columns))
+    # The size and the labels (format...) identify a row, the rest are measures
+    def row_key(row):
+        return tuple(value for column, value in row.items() if column == 'size' or isinstance(value, str))
+    old_by_key = {row_key(row): row for row in (baseline or [])}
+    for row in rows:
+        print('  '.join(f'{row[column]!s:>20}' for column in columns))
+        old = old_by_key.get(row_key(row))
+        if old:
+            print('  '.join(
+                f"{'vs base' if column == 'size' else _delta(old.get(column), row[column]):>20}"
+                for column in columns
+            ))
+
+
+def _delta(old, new):
+    if not isinstance(old, (int, float)) or not isinstance(new, (int, float)) or not old:
+        return '-'
+    return f'{(new - old) / old * 100:+.0f}%'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('-c', '--config', help='Odoo configuration file')
+    parser.add_argument('-d', '--db', help='database, for the benchmarks that need one')
+    parser.add_argument('--addons-path', help='Odoo addons path, when not in the configuration file')
+    parser.add_argument('--output', help='write the JSON results to this file')
+    parser.add_argument('--compare', help='JSON results of an earlier run to compare with')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+    for name, (_func, help, sizes, _database) in BENCHMARKS.items():
+        subparser = subparsers.add_parser(name, help=help)
+        subparser.add_argument('--sizes', type=int, nargs='+', default=sizes)
+    args = parser.parse_args()
+    func, _help, _sizes, database = BENCHMARKS[args.benchmark]
+    if database and not args.db:
+        parser.error(f'the {args.benchmark} benchmark needs a database (-d)')
+
+    from odoo import SUPERUSER_ID, api
+    from odoo.modules.module import initialize_sys_path
+    from odoo.modules.registry import Registry
+    from odoo.tools import config
+
+    odoo_args = ['-d', args.db] if args.db else []
+    if args.config:
+        odoo_args += ['-c', args.config]
+    if args.addons_path:
+        odoo_args += ['--addons-path', args.addons_path]
+    config.parse_config(odoo_args)
+    initialize_sys_path()
+
+    print(f'running {args.benchmark} on {args.sizes}', file=sys.stderr)
+    if not database:
+        rows = func(None, args)
+    else:
+        registry = Registry(args.db)
+        with registry.cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            try:
+                rows = func(env, args)
+            finally:
+                # Leave the database as it was
+                cr.rollback()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f).get(args.benchmark)
+    print_results(args.benchmark, rows, baseline)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({args.benchmark: rows}, f, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,324 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Load test for the my_hr check-in and dashboard endpoints.
+
+Runs against a local Odoo server with my_hr installed, using only the
+standard library (psycopg2 is optional, for SQL query counts).
+
+    # seed 200 employees with 3 months of attendance, then run 50 users
+    python3 my_hr_loadtest.py --db loadtest --employees 200 --months 3 \\
+        --users 50 --duration 60 --output run.json
+
+    # compare with an earlier run
+    python3 my_hr_loadtest.py --db loadtest --users 50 --duration 60 \\
+        --output run2.json --compare run.json
+
+Each endpoint is driven in its own phase so that the SQL query count,
+read from pg_stat_statements when --dsn is given and the extension is
+installed, can be attributed to it. Query counts include whatever else
+the server runs meanwhile (crons, bus), so run on an otherwise idle
+server. Seeding is idempotent: users named <prefix>NNNN are reused.
+"""
+import argparse
+import http.cookiejar
+import json
+import math
+import random
+import statistics
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+try:
+    import psycopg2
+except ImportError:
+    psycopg2 = None
+
+# Office the seeded employees are allowed to punch at
+OFFICE = {'name': 'Load Test Office', 'latitude': 24.7136, 'longitude': 46.6753, 'radius': 500.0}
+SEED_BATCH_SIZE = 500
+PHASES = {
+    'check': ('/my_hr/attendance/check', lambda rnd: {
+        'latitude': OFFICE['latitude'] + rnd.uniform(-0.001, 0.001),
+        'longitude': OFFICE['longitude'] + rnd.uniform(-0.001, 0.001),
+        'user_agent': 'my_hr-loadtest',
+    }),
+    'status': ('/my_hr/attendance/status', lambda rnd: {}),
+    'dashboard': ('/my_hr/dashboard/data', lambda rnd: {}),
+}
+
+
+class RpcError(Exception):
+    pass
+
+
+class Session:
+    """JSON-RPC client keeping its own session cookie."""
+
+    def __init__(self, url):
+        self.url = url.rstrip('/')
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar())
+        )
+
+    def call(self, path, params, timeout=60):
+        body = json.dumps({'jsonrpc': '2.0', 'method': 'call', 'params': params, 'id': 1})
+        req = urllib.request.Request(
+            self.url + path, data=body.encode(), headers={'Content-Type': 'application/json'}
+        )
+        with self.opener.open(req, timeout=timeout) as response:
+            payload = json.loads(response.read())
+        if payload.get('error'):
+            error = payload['error']
+            raise RpcError(error.get('data', {}).get('message') or error.get('message'))
+        return payload.get('result')
+
+    def authenticate(self, db, login, password):
+        return self.call('/web/session/authenticate', {'db': db, 'login': login, 'password': password})
+
+
+class Admin:
+    """execute_kw helper for seeding, through the external JSON-RPC API."""
+
+    def __init__(self, url, db, login, password):
+        self.session = Session(url)
+        self.db, self.password = db, password
+        self.uid = self.session.call('/jsonrpc', {
+            'service': 'common', 'method': 'login', 'args': [db, login, password],
+        })
+        if not self.uid:
+            raise RpcError(f'Cannot log in as {login}')
+
+    def __call__(self, model, method, *args, **kwargs):
+        return self.session.call('/jsonrpc', {
+            'service': 'object', 'method': 'execute_kw',
+            'args': [self.db, self.uid, self.password, model, method, list(args), kwargs],
+        }, timeout=600)
+
+
+def seed(args):
+    """Create the office, users, employees and attendance history."""
+    admin = Admin(args.url, args.db, args.admin_login, args.admin_password)
+    office_ids = admin('hr.office.geofence', 'search', [('name', '=', OFFICE['name'])])
+    office_id = office_ids[0] if office_ids else admin('hr.office.geofence', 'create', OFFICE)
+
+    logins = [f'{args.prefix}{i:04d}' for i in range(args.employees)]
+    existing = {
+        user['login']: user['id']
+        for user in admin('res.users', 'search_read', [('login', 'in', logins)], fields=['login'])
+    }
+    missing = [login for login in logins if login not in existing]
+    for offset in range(0, len(missing), SEED_BATCH_SIZE):
+        chunk = missing[offset:offset + SEED_BATCH_SIZE]
+        user_ids = admin('res.users', 'create', [
+            {'name': login, 'login': login, 'password': args.user_password} for login in chunk
+        ])
+        employee_ids = admin('hr.employee', 'create', [
+            {'name': login, 'user_id': user_id, 'allowed_office_ids': [(6, 0, [office_id])]}
+            for login, user_id in zip(chunk, user_ids)
+        ])
+        _seed_attendance(admin, employee_ids, args.months)
+        print(f'seeded {offset + len(chunk)}/{len(missing)} employees', file=sys.stderr)
+    return logins
+
+
+def _seed_attendance(admin, employee_ids, months):
+    """Weekday attendances from `months` months ago up to yesterday."""
+    today = date.today()
+    day = today - timedelta(days=30 * months)
+    vals_list = []
+    while day < today:
+        if day.weekday() < 5:
+            for employee_id in employee_ids:
+                check_in = datetime.combine(day, datetime.min.time()) + timedelta(hours=5)
+                vals_list.append({
+                    'employee_id': employee_id,
+                    'check_in': check_in.strftime('%Y-%m-%d %H:%M:%S'),
+                    'check_out': (check_in + timedelta(hours=8)).strftime('%Y-%m-%d %H:%M:%S'),
+                })
+        day += timedelta(days=1)
+    for offset in range(0, len(vals_list), SEED_BATCH_SIZE):
+        admin('hr.attendance', 'create', vals_list[offset:offset + SEED_BATCH_SIZE])
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    rank = max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)
+    return sorted_values[rank]
+
+
+class QueryCounter:
+    """Total statements executed in the database, from pg_stat_statements."""
+
+    def __init__(self, dsn, db):
+        self.conn = None
+        if not dsn:
+            return
+        if psycopg2 is None:
+            print('psycopg2 not installed, SQL query counts disabled', file=sys.stderr)
+            return
+        conn = psycopg2.connect(dsn)
+        conn.autocommit = True
+        with conn.cursor() as cr:
+            cr.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_stat_statements'")
+            if not cr.fetchone():
+                print('pg_stat_statements not installed, SQL query counts disabled', file=sys.stderr)
+                conn.close()
+                return
+        self.conn, self.db = conn, db
+
+    def total(self):
+        if not self.conn:
+            return None
+        with self.conn.cursor() as cr:
+            cr.execute("""
+                SELECT COALESCE(SUM(calls), 0) FROM pg_stat_statements
+                 WHERE dbid = (SELECT oid FROM pg_database WHERE datname = %s)
+            """, (self.db,))
+            return int(cr.fetchone()[0])
+
+
+def run_phase(name, sessions, args, counter):
+    path, make_params = PHASES[name]
+    latencies = []
+    errors = {}
+    lock = threading.Lock()
+    deadline = time.monotonic() + args.duration
+
+    def worker(index, session):
+        rnd = random.Random(args.seed * 100003 + index)
+        # Spread the first requests like a real arrival spike
+        time.sleep(rnd.uniform(0, args.ramp_up))
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                result = session.call(path, make_params(rnd))
+                error = result.get('error') if isinstance(result, dict) else None
+            except Exception as e:
+                error = type(e).__name__
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                if error:
+                    errors[str(error)[:80]] = errors.get(str(error)[:80], 0) + 1
+            time.sleep(rnd.expovariate(1 / args.think_time) if args.think_time else 0)
+
+    queries_before = counter.total()
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(sessions)) as pool:
+        list(pool.map(worker, range(len(sessions)), sessions))
+    wall = time.perf_counter() - wall_start
+    queries_after = counter.total()
+
+    latencies.sort()
+    count = len(latencies)
+    queries = None if queries_before is None else queries_after - queries_before
+    return {
+        'endpoint': path,
+        'requests': count,
+        'errors': sum(errors.values()),
+        'error_reasons': errors,
+        'throughput_rps': round(count / wall, 2) if wall else None,
+        'latency_ms': {
+            key: round(value * 1000, 1) if value is not None else None
+            for key, value in {
+                'mean': statistics.fmean(latencies) if latencies else None,
+                'p50': percentile(latencies, 50),
+                'p95': percentile(latencies, 95),
+                'p99': percentile(latencies, 99),
+                'max': latencies[-1] if latencies else None,
+            }.items()
+        },
+        'queries_per_request': round(queries / count, 1) if queries is not None and count else None,
+    }
+
+
+def print_report(report, baseline=None):
+    header = f"{'phase':<10} {'reqs':>7} {'err':>5} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'q/req':>7}"
+    print(header)
+    print('-' * len(header))
+    for name, phase in report['phases'].items():
+        lat = phase['latency_ms']
+        print(f"{name:<10} {phase['requests']:>7} {phase['errors']:>5} {phase['throughput_rps']:>8} "
+              f"{lat['p50']!s:>8} {lat['p95']!s:>8} {lat['p99']!s:>8} {phase['queries_per_request']!s:>7}")
+        old = baseline and baseline['phases'].get(name)
+        if old:
+            print(f"{'  vs base':<10} {'':>7} {'':>5} {_delta(old['throughput_rps'], phase['throughput_rps']):>8} "
+                  + ' '.join(f"{_delta(old['latency_ms'][k], lat[k]):>8}" for k in ('p50', 'p95', 'p99'))
+                  + f" {_delta(old['queries_per_request'], phase['queries_per_request']):>7}")
+    if baseline and baseline['config'] != report['config']:
+        print('warning: baseline was run with a different configuration', file=sys.stderr)
+
+
+def _delta(old, new):
+    if old is None or new is None or not old:
+        return '-'
+    return f'{(new - old) / old * 100:+.0f}%'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--url', default='http://localhost:8069')
+    parser.add_argument('--db', required=True)
+    parser.add_argument('--dsn', help='PostgreSQL DSN of the same database, for query counts')
+    parser.add_argument('--admin-login', default='admin')
+    parser.add_argument('--admin-password', default='admin')
+    parser.add_argument('--prefix', default='loadtest_')
+    parser.add_argument('--user-password', default='loadtest')
+    parser.add_argument('--employees', type=int, default=100)
+    parser.add_argument('--months', type=int, default=3, help='months of attendance history to seed')
+    parser.add_argument('--no-seed', action='store_true', help='reuse previously seeded users only')
+    parser.add_argument('--users', type=int, default=20, help='concurrent simulated users')
+    parser.add_argument('--duration', type=float, default=30, help='seconds per phase')
+    parser.add_argument('--ramp-up', type=float, default=2, help='seconds over which users start')
+    parser.add_argument('--think-time', type=float, default=1.0,
+                        help='mean pause between requests of one user, in seconds')
+    parser.add_argument('--phases', default=','.join(PHASES), help='comma-separated subset of phases')
+    parser.add_argument('--seed', type=int, default=42, help='random seed, keep it fixed across runs')
+    parser.add_argument('--output', help='write the JSON report to this file')
+    parser.add_argument('--compare', help='JSON report of an earlier run to compare with')
+    args = parser.parse_args()
+
+    if args.no_seed:
+        logins = [f'{args.prefix}{i:04d}' for i in range(args.employees)]
+    else:
+        logins = seed(args)
+    users = min(args.users, len(logins))
+
+    sessions = []
+    for login in logins[:users]:
+        session = Session(args.url)
+        session.authenticate(args.db, login, args.user_password)
+        sessions.append(session)
+
+    counter = QueryCounter(args.dsn, args.db)
+    config = {
+        key: getattr(args, key)
+        for key in ('employees', 'months', 'users', 'duration', 'ramp_up', 'think_time', 'phases', 'seed')
+    }
+    report = {
+        'started_at': datetime.now().isoformat(timespec='seconds'),
+        'config': config,
+        'phases': {},
+    }
+    for name in args.phases.split(','):
+        print(f'running phase {name} ({users} users, {args.duration}s)', file=sys.stderr)
+        report['phases'][name] = run_phase(name, sessions, args, counter)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
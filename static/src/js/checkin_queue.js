@@ -0,0 +1,209 @@
+/** @odoo-module **/
+
+/**
+ * Device-side queue of attendance punches.
+ *
+ * Punches are stored in IndexedDB, keyed by a client generated id, with the
+ * device timestamp of the tap. They stay there until the server has answered
+ * for them, so a punch recorded on a weak or missing connection is sent on a
+ * later flush instead of being lost. When IndexedDB is unavailable (private
+ * browsing, old webviews) the queue falls back to memory.
+ */
+
+const DB_NAME = "my_hr_checkin_queue";
+const STORE_NAME = "punches";
+const FLUSH_BATCH_SIZE = 50;
+
+function generateClientUid() {
+    if (window.crypto && window.crypto.randomUUID) {
+        return window.crypto.randomUUID();
+    }
+    return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 12)}`;
+}
+
+function requestToPromise(req) {
+    return new Promise((resolve, reject) => {
+        req.onsuccess = () => resolve(req.result);
+        req.onerror = () => reject(req.error);
+    });
+}
+
+class MemoryStore {
+    constructor() {
+        this.punches = new Map();
+    }
+    async put(punch) {
+        this.punches.set(punch.client_uid, punch);
+    }
+    async getAll() {
+        return [...this.punches.values()];
+    }
+    async delete(clientUids) {
+        clientUids.forEach((uid) => this.punches.delete(uid));
+    }
+}
+
+class IndexedDBStore {
+    constructor(db) {
+        this.db = db;
+    }
+    static open() {
+        return new Promise((resolve, reject) => {
+            const req = window.indexedDB.open(DB_NAME, 1);
+            req.onupgradeneeded = () => {
+                req.result.createObjectStore(STORE_NAME, { keyPath: "client_uid" });
+            };
+            req.onsuccess = () => resolve(new IndexedDBStore(req.result));
+            req.onerror = () => reject(req.error);
+        });
+    }
+    _store(mode) {
+        return this.db.transaction(STORE_NAME, mode).objectStore(STORE_NAME);
+    }
+    async put(punch) {
+        await requestToPromise(this._store("readwrite").put(punch));
+    }
+    async getAll() {
+        return requestToPromise(this._store("readonly").getAll());
+    }
+    async delete(clientUids) {
+        const tx = this.db.transaction(STORE_NAME, "readwrite");
+        const store = tx.objectStore(STORE_NAME);
+        clientUids.forEach((uid) => store.delete(uid));
+        await new Promise((resolve, reject) => {
+            tx.oncomplete = () => resolve();
+            tx.onerror = () => reject(tx.error);
+        });
+    }
+}
+
+let storePromise = null;
+
+function getStore() {
+    if (!storePromise) {
+        storePromise = (window.indexedDB ? IndexedDBStore.open() : Promise.reject())
+            .catch((err) => {
+                console.warn("my_hr: IndexedDB not available, queue kept in memory:", err);
+                return new MemoryStore();
+            });
+    }
+    return storePromise;
+}
+
+/**
+ * Record a punch with its device timestamp, and its photo Blob if any.
+ * Returns the stored punch.
+ */
+export async function enqueuePunch(values, photo = null) {
+    const punch = {
+        ...values,
+        client_uid: generateClientUid(),
+        timestamp: new Date().toISOString(),
+        photo_blob: photo,
+        answered: false,
+    };
+    const store = await getStore();
+    await store.put(punch);
+    return punch;
+}
+
+/**
+ * Upload a photo as the raw request body, without base64 encoding.
+ */
+async function uploadPhoto(punch) {
+    const params = new URLSearchParams({
+        client_uid: punch.client_uid,
+        csrf_token: odoo.csrf_token,
+    });
+    const response = await fetch(`/my_hr/attendance/photo?${params}`, {
+        method: "POST",
+        headers: { "Content-Type": punch.photo_blob.type || "image/webp" },
+        body: punch.photo_blob,
+    });
+    // Client errors (bad or oversized photo) will not get better on retry
+    if (response.status >= 500) {
+        throw new Error(`photo upload failed (${response.status})`);
+    }
+}
+
+let flushing = null;
+
+/**
+ * Send the queued punches to the server, oldest first, in batches, then
+ * upload the photos of the punches answered as check-ins.
+ * A punch is removed once the server answered for it (ingested, duplicate
+ * or rejected) and its photo, if needed, is uploaded; the rest stay queued
+ * when the network fails.
+ * Resolves to { results, status, pending } or null when nothing was sent,
+ * pending counting the punches the server has not answered for yet.
+ * Concurrent calls share the same flush.
+ */
+export function flushPunches(rpc) {
+    if (!flushing) {
+        flushing = _flush(rpc).finally(() => {
+            flushing = null;
+        });
+    }
+    return flushing;
+}
+
+async function _flushBatch(rpc, store, batch) {
+    const unanswered = batch
+        .filter((punch) => !punch.answered)
+        .map(({ photo_blob, answered, status, ...punch }) => punch);
+    const response = unanswered.length
+        ? await rpc("/my_hr/attendance/bulk", { punches: unanswered })
+        : { success: true, results: [], status: null };
+    if (!response.success) {
+        throw new Error(response.error);
+    }
+
+    const statuses = new Map(response.results.map((r) => [r.client_uid, r.status]));
+    const answeredPunches = batch
+        .filter((punch) => punch.answered || statuses.has(punch.client_uid))
+        .map((punch) => ({ ...punch, status: punch.answered ? punch.status : statuses.get(punch.client_uid) }));
+    // Only check-ins carry a photo; a duplicate may be a check-in whose
+    // answer was lost, the server drops its photo otherwise
+    const withPhoto = answeredPunches.filter(
+        (punch) => punch.photo_blob && ["check_in", "duplicate"].includes(punch.status)
+    );
+    const uploads = await Promise.allSettled(withPhoto.map((punch) => uploadPhoto(punch)));
+    const notUploaded = new Set(
+        withPhoto.filter((punch, i) => uploads[i].status !== "fulfilled").map((punch) => punch.client_uid)
+    );
+
+    const done = [];
+    for (const punch of answeredPunches) {
+        if (notUploaded.has(punch.client_uid)) {
+            // Only the photo is left to send
+            await store.put({ ...punch, answered: true });
+        } else {
+            done.push(punch.client_uid);
+        }
+    }
+    await store.delete(done);
+    return { response, answered: answeredPunches.length };
+}
+
+async function _flush(rpc) {
+    const store = await getStore();
+    const queued = (await store.getAll()).sort((a, b) => a.timestamp.localeCompare(b.timestamp));
+    if (!queued.length) {
+        return null;
+    }
+    const results = [];
+    let status = null;
+    let answered = 0;
+    try {
+        for (let i = 0; i < queued.length; i += FLUSH_BATCH_SIZE) {
+            const batch = queued.slice(i, i + FLUSH_BATCH_SIZE);
+            const flushed = await _flushBatch(rpc, store, batch);
+            results.push(...flushed.response.results);
+            status = flushed.response.status || status;
+            answered += flushed.answered;
+        }
+    } catch (err) {
+        console.warn("my_hr: punches kept in queue:", err && err.message);
+    }
+    return { results, status, pending: queued.length - answered };
+}
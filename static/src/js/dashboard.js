@@ -112,6 +112,47 @@ class MyHrDashboard extends Component {
         }
     }
 
+    /**
+     * Load the events of the displayed month from the calendar endpoint.
+     * The browser revalidates with If-None-Match, so an unchanged month
+     * costs a 304 instead of a full query.
+     */
+    async _loadCalendar() {
+        const year = this.state.calendarYear;
+        const month = this.state.calendarMonth;
+        const pad = (n) => String(n).padStart(2, "0");
+        const lastDay = new Date(year, month + 1, 0).getDate();
+        const params = new URLSearchParams({
+            date_from: `${year}-${pad(month + 1)}-01`,
+            date_to: `${year}-${pad(month + 1)}-${pad(lastDay)}`,
+        });
+        try {
+            const response = await fetch(`/my_hr/dashboard/calendar?${params}`, {
+                credentials: "same-origin",
+            });
+            if (!response.ok) {
+                throw new Error(`HTTP ${response.status}`);
+            }
+            const data = await response.json();
+            // Ignore late responses for a month the user already left
+            if (year !== this.state.calendarYear || month !== this.state.calendarMonth) {
+                return;
+            }
+            this.state.calendarEvents = (data.dates || []).map((date, i) => ({
+                date,
+                type: data.types[i],
+                hours: data.hours[i],
+                check_in: data.check_in[i],
+                check_out: data.check_out[i],
+                label: data.labels[i],
+            }));
+            this._updateCalendar();
+        } catch (e) {
+            console.error("dashboard calendar load error", e);
+            this.notification.add(_t("Could not load calendar events."), { type: "warning" });
+        }
+    }
+
     _updateCalendar() {
         this.state.calendar = buildCalendarData(
             this.state.calendarEvents,
@@ -128,6 +169,7 @@ class MyHrDashboard extends Component {
             this.state.calendarMonth -= 1;
         }
         this._updateCalendar();
+        this._loadCalendar();
     }
 
     nextMonth() {
@@ -138,6 +180,7 @@ class MyHrDashboard extends Component {
             this.state.calendarMonth += 1;
         }
         this._updateCalendar();
+        this._loadCalendar();
     }
 
     getMonthYearDisplay() {
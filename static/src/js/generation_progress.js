@@ -0,0 +1,74 @@
+/** @odoo-module **/
+
+import { Component, useState, onMounted, onWillUnmount } from "@odoo/owl";
+import { registry } from "@web/core/registry";
+import { useService } from "@web/core/utils/hooks";
+import { standardFieldProps } from "@web/views/fields/standard_field_props";
+
+const POLL_DELAY = 3000;
+
+/**
+ * Progress bar for background payslip generation.
+ * While the batch is queued or running it polls the three progress
+ * fields only, and reloads the whole record once generation is done.
+ */
+class GenerationProgressField extends Component {
+    static template = "my_hr.GenerationProgressField";
+    static props = { ...standardFieldProps };
+
+    setup() {
+        this.orm = useService("orm");
+        const data = this.props.record.data;
+        this.state = useState({
+            processed: data.generation_processed || 0,
+            total: data.generation_total || 0,
+        });
+
+        this._pollTimeout = null;
+        onMounted(() => this._schedulePoll());
+        onWillUnmount(() => {
+            if (this._pollTimeout) clearTimeout(this._pollTimeout);
+        });
+    }
+
+    get percent() {
+        if (!this.state.total) return 0;
+        return Math.min(100, Math.round((100 * this.state.processed) / this.state.total));
+    }
+
+    _schedulePoll() {
+        const generationState = this.props.record.data.generation_state;
+        if (generationState !== "queued" && generationState !== "running") return;
+        this._pollTimeout = setTimeout(() => this._poll(), POLL_DELAY);
+    }
+
+    async _poll() {
+        this._pollTimeout = null;
+        const record = this.props.record;
+        try {
+            const [vals] = await this.orm.read(record.resModel, [record.resId], [
+                "generation_state",
+                "generation_processed",
+                "generation_total",
+            ]);
+            if (!vals) return;
+            this.state.processed = vals.generation_processed;
+            this.state.total = vals.generation_total;
+            if (vals.generation_state !== "queued" && vals.generation_state !== "running") {
+                await record.model.load();
+                return;
+            }
+        } catch (e) {
+            // Keep polling; a transient error should not stop the progress bar
+            console.warn("my_hr: generation progress poll failed", e);
+        }
+        this._schedulePoll();
+    }
+}
+
+registry.category("fields").add("my_hr_generation_progress", {
+    component: GenerationProgressField,
+    supportedTypes: ["float"],
+});
+
+export { GenerationProgressField };
@@ -4,10 +4,12 @@ import { Component, useState, onMounted, onWillUnmount } from "@odoo/owl";
 import { registry } from "@web/core/registry";
 import { useService } from "@web/core/utils/hooks";
 import { _t } from "@web/core/l10n/translation";
+import { session } from "@web/session";
+import { enqueuePunch, flushPunches } from "./checkin_queue";
 
 /**
  * Captures image from webcam, resizes to max 320px width,
- * converts to webp at 50% quality, returns base64 string.
+ * converts to webp at 50% quality, returns a Blob (null without camera).
  */
 async function captureAndCompressPhoto() {
     return new Promise((resolve, reject) => {
@@ -37,14 +39,10 @@ async function captureAndCompressPhoto() {
                             const ctx = canvas.getContext("2d");
                             ctx.drawImage(video, 0, 0, canvas.width, canvas.height);
 
-                            // Convert to webp at 50% quality
-                            const dataURL = canvas.toDataURL("image/webp", 0.5);
-                            // Strip the data URI prefix to get raw base64
-                            const base64 = dataURL.split(",")[1] || "";
-
                             // Clean up
                             stream.getTracks().forEach((t) => t.stop());
-                            resolve(base64);
+                            // Convert to webp at 50% quality, kept binary
+                            canvas.toBlob((blob) => resolve(blob), "image/webp", 0.5);
                         } catch (err) {
                             stream.getTracks().forEach((t) => t.stop());
                             reject(err);
@@ -55,7 +53,7 @@ async function captureAndCompressPhoto() {
             .catch((err) => {
                 // Camera not available - resolve empty (attendance still possible)
                 console.warn("my_hr: Camera not available:", err.message);
-                resolve("");
+                resolve(null);
             });
     });
 }
@@ -92,6 +90,7 @@ class SystrayCheckin extends Component {
 
     setup() {
         this.notification = useService("notification");
+        this.busService = useService("bus_service");
         // avoid fetching rpc from services during setup; some contexts
         // (e.g. early rendering) may not yet provide it. Access lazily when
         // needed via the getter below.
@@ -102,10 +101,27 @@ class SystrayCheckin extends Component {
             loading: false,
         });
 
-        this._pollInterval = null;
-        onMounted(() => this._loadStatus());
+        // Status changes are pushed over the bus by the server whenever an
+        // attendance is created or checked out, from any tab or device.
+        this._onStatusPushed = (payload) => this._applyStatus(payload);
+        this.busService.subscribe("my_hr.attendance_status", this._onStatusPushed);
+
+        // First render uses the status shipped with the session info
+        const initialStatus = session.my_hr_attendance_status;
+        if (initialStatus) {
+            this._applyStatus(initialStatus);
+        } else {
+            onMounted(() => this._loadStatus());
+        }
+        // Punches left queued by an earlier session or a lost connection
+        this._onOnline = () => this._flushQueue();
+        onMounted(() => {
+            window.addEventListener("online", this._onOnline);
+            this._flushQueue();
+        });
         onWillUnmount(() => {
-            if (this._pollInterval) clearInterval(this._pollInterval);
+            this.busService.unsubscribe("my_hr.attendance_status", this._onStatusPushed);
+            window.removeEventListener("online", this._onOnline);
         });
     }
 
@@ -119,14 +135,18 @@ class SystrayCheckin extends Component {
         try {
             const result = await this.rpc("/my_hr/attendance/status", {});
             if (result) {
-                this.state.checkedIn = result.checked_in || false;
-                this.state.checkInTime = result.check_in_time || "";
+                this._applyStatus(result);
             }
         } catch (e) {
             // Silently fail on status load
         }
     }
 
+    _applyStatus(status) {
+        this.state.checkedIn = status.checked_in || false;
+        this.state.checkInTime = status.check_in_time || "";
+    }
+
     async onClick() {
         if (this.state.loading) return;
         this.state.loading = true;
@@ -138,30 +158,39 @@ class SystrayCheckin extends Component {
                 captureAndCompressPhoto(),
             ]);
 
-            const result = await this.rpc("/my_hr/attendance/check", {
-                latitude: position.latitude,
-                longitude: position.longitude,
-                photo: photo,
-                user_agent: navigator.userAgent || "",
-            });
-
-            if (result.success) {
-                const action = result.action;
-                const time = result.timestamp || "";
-                this.state.checkedIn = action === "check_in";
-                this.state.checkInTime = action === "check_in" ? time.slice(11, 16) : "";
-
+            // The punch keeps the time of the tap, however late it is sent
+            const punch = await enqueuePunch(
+                {
+                    latitude: position.latitude,
+                    longitude: position.longitude,
+                    user_agent: navigator.userAgent || "",
+                },
+                photo
+            );
+            const checkingIn = !this.state.checkedIn;
+            const time = new Date(punch.timestamp).toTimeString().slice(0, 5);
+            this.state.checkedIn = checkingIn;
+            this.state.checkInTime = checkingIn ? time : "";
+
+            const flushed = await this._flushQueue();
+            const result = flushed && flushed.results.find((r) => r.client_uid === punch.client_uid);
+            if (!result) {
                 this.notification.add(
-                    action === "check_in"
-                        ? _t("Checked in successfully at %(time)s", { time: time.slice(11, 16) })
-                        : _t("Checked out successfully at %(time)s", { time: time.slice(11, 16) }),
-                    { type: "success", sticky: false }
+                    _t("No connection. Your punch at %(time)s is saved and will be sent automatically.", { time }),
+                    { type: "warning", sticky: false }
                 );
-            } else {
+            } else if (result.status === "rejected") {
                 this.notification.add(
                     result.error || _t("Attendance failed. Please try again."),
                     { type: "danger", sticky: true }
                 );
+            } else {
+                this.notification.add(
+                    result.status === "check_in"
+                        ? _t("Checked in successfully at %(time)s", { time })
+                        : _t("Checked out successfully at %(time)s", { time }),
+                    { type: "success", sticky: false }
+                );
             }
         } catch (err) {
             this.notification.add(
@@ -173,6 +202,14 @@ class SystrayCheckin extends Component {
             this.state.loading = false;
         }
     }
+
+    async _flushQueue() {
+        const flushed = await flushPunches(this.rpc);
+        if (flushed && flushed.status && !flushed.pending) {
+            this._applyStatus(flushed.status);
+        }
+        return flushed;
+    }
 }
 
 // Register in the systray
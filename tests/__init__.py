@@ -0,0 +1,3 @@
+# -*- coding: utf-8 -*-
+from . import test_attendance_ingest
+from . import test_geofence_audit
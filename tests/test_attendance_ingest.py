@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+from datetime import timedelta
+
+from odoo import fields
+from odoo.tests import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestAttendanceIngest(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.employee = cls.env['hr.employee'].create({'name': 'Punch Tester'})
+        cls.Attendance = cls.env['hr.attendance']
+
+    def _punch(self, client_uid, minutes_ago):
+        stamp = fields.Datetime.now() - timedelta(minutes=minutes_ago)
+        return {'client_uid': client_uid, 'timestamp': stamp.isoformat()}
+
+    def test_duplicated_uid_in_payload(self):
+        """A client_uid sent twice in one payload is applied and answered once."""
+        check_in = self._punch('uid-in', 10)
+        results = self.Attendance._my_hr_ingest_punches(self.employee, [
+            check_in, dict(check_in), self._punch('uid-out', 5),
+        ])
+        self.assertEqual(results, [
+            {'client_uid': 'uid-in', 'status': 'check_in'},
+            {'client_uid': 'uid-out', 'status': 'check_out'},
+        ])
+        attendance = self.Attendance.search([('employee_id', '=', self.employee.id)])
+        self.assertEqual(len(attendance), 1)
+        self.assertEqual(attendance.check_in_client_uid, 'uid-in')
+        self.assertEqual(attendance.check_out_client_uid, 'uid-out')
+
+    def test_resent_punches_are_duplicates(self):
+        punches = [self._punch('uid-a', 10), self._punch('uid-b', 5)]
+        self.Attendance._my_hr_ingest_punches(self.employee, punches)
+        results = self.Attendance._my_hr_ingest_punches(self.employee, punches)
+        self.assertEqual([r['status'] for r in results], ['duplicate', 'duplicate'])
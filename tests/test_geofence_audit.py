@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+from datetime import timedelta
+
+from odoo import fields
+from odoo.tests import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestGeofenceAudit(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.company = cls.env.company
+        other_company = cls.env['res.company'].create({'name': 'Other Company'})
+        Geofence = cls.env['hr.office.geofence']
+        cls.office = Geofence.create({
+            'name': 'Head Office', 'latitude': 24.7136, 'longitude': 46.6753,
+            'radius': 200, 'company_id': cls.company.id,
+        })
+        cls.other_office = Geofence.create({
+            'name': 'Branch of Other Company', 'latitude': 21.4858, 'longitude': 39.1925,
+            'radius': 200, 'company_id': other_company.id,
+        })
+        cls.employee = cls.env['hr.employee'].create({'name': 'Audited Employee'})
+
+    def _attendance(self, latitude, longitude):
+        return self.env['hr.attendance'].create({
+            'employee_id': self.employee.id,
+            'check_in': fields.Datetime.now() - timedelta(hours=1),
+            'check_in_latitude': latitude,
+            'check_in_longitude': longitude,
+        })
+
+    def _audit(self):
+        today = fields.Date.today()
+        return self.env['my_hr.geofence.audit']._run_audit(self.company, today - timedelta(days=1), today)
+
+    def test_allowed_office_of_other_company(self):
+        """Like the punch check, the audit matches allowed offices of other companies."""
+        self.employee.allowed_office_ids = self.other_office
+        attendance = self._attendance(21.4858, 39.1925)
+        stats = self._audit()
+        self.assertEqual(stats['inside_count'], 1)
+        self.assertEqual(attendance.geofence_id, self.other_office)
+        self.assertFalse(attendance.outside_geofence)
+
+    def test_allowed_offices_restrict_matches(self):
+        """A company office the employee is not allowed in does not match."""
+        self.employee.allowed_office_ids = self.other_office
+        attendance = self._attendance(24.7136, 46.6753)
+        self._audit()
+        self.assertFalse(attendance.geofence_id)
+        self.assertTrue(attendance.outside_geofence)
+
+    def test_without_allowed_offices(self):
+        attendance = self._attendance(24.7136, 46.6753)
+        self._audit()
+        self.assertEqual(attendance.geofence_id, self.office)